@@ -4,7 +4,6 @@
 """🤖 Module to build Discord interactions and automate IT actions 🤖."""
 
 import discord
-import ovh
 
 from loguru import logger
 
@@ -27,18 +26,20 @@ from subcommands import (
     public_cloud,
     private_cloud,
     )
+from utils.gateway import init_gateway
 
 # Log Internal imports
 logger.info('Internal loading OK')
 
 try:
-    ovh_client = ovh.Client(
+    ovh_client = init_gateway(
         endpoint=OVH_ENDPOINT,
         application_key=OVH_AK,
         application_secret=OVH_AS,
         consumer_key=OVH_CK,
         )
-    me = ovh_client.get('/me')
+    # The event loop is not running yet, we use the blocking client directly
+    me = ovh_client.client.get('/me')
     if me['nichandle']:
         my_nic = me['nichandle']
 
@@ -103,6 +104,7 @@ else:
     logger.debug(f'Group OK (/{DISCORD_GROUP_GENERAL})')
 
 general.billing(group_global, ovh_client, my_nic)
+general.jobs(group_global)
 general.settings(group_global)
 
 
@@ -2,6 +2,7 @@
 
 """Module to locate all Autocomplete lists."""
 import os
+import time
 
 import discord
 
@@ -11,33 +12,126 @@ from variables import (
     ANSIBLE_PLAYBOOK_FOLDER,
 )
 
+from utils.matcher import ChoiceIndex
+
+from ._catalogue import catalogue
+from ._inventory import inventory
+
+# The inventory file is stat()-ed at most once per interval, not per keystroke
+INVENTORY_CHECK_INTERVAL = 2
+
+#
+# Ansible related Autocomplete indexes
+#
+
+inventory_index = {
+    'checked_at': 0,
+    'config': None,
+    'sections': ChoiceIndex([]),
+    'hosts': ChoiceIndex([]),
+    'section_hosts': {},
+    }
+
+
+def get_inventory_index():
+    """
+    Function to serve the inventory indexes.
+    They are rebuilt only when the inventory was reloaded (file changed).
+    """
+    now = time.monotonic()
+    if now - inventory_index['checked_at'] >= INVENTORY_CHECK_INTERVAL:
+        inventory_index['checked_at'] = now
+        inventory.refresh()
+
+    if inventory.config is not inventory_index['config']:
+        inventory_index['sections'] = ChoiceIndex(
+            (
+                discord.OptionChoice(f"📁 {group} ({len(hosts)} hosts)", value=group),
+                (group,),
+                )
+            for group, hosts in inventory.groups.items()
+            )
+        inventory_index['hosts'] = ChoiceIndex(
+            (
+                discord.OptionChoice(f"🖥️ {host} ({', '.join(groups)})", value=host),
+                (host,),
+                )
+            for host, groups in inventory.host_groups.items()
+            )
+        # Built on demand, per section
+        inventory_index['section_hosts'] = {}
+        inventory_index['config'] = inventory.config
+    return inventory_index
+
+
+def get_section_hosts_index(index, section):
+    """ Function to serve the index of the hosts of a section. """
+    if section not in index['section_hosts']:
+        index['section_hosts'][section] = ChoiceIndex(
+            (
+                discord.OptionChoice(f"🖥️ {host}", value=host),
+                (host,),
+                )
+            for host in inventory.groups.get(section, {})
+            )
+    return index['section_hosts'][section]
+
+
 #
 # Ansible related Autocomplete lists
 #
 
+async def get_section_list(ctx: discord.AutocompleteContext):
+    """ Function to build and serve an Autocomplete list of inventory sections. """
+    try:
+        index = get_inventory_index()
+    except Exception as e:
+        logger.error(f'Autocomplete generation KO [{e}]')
+        return []
+    else:
+        return index['sections'].search(ctx.value)
+
+
+async def get_host_list(ctx: discord.AutocompleteContext):
+    """
+    Function to build and serve an Autocomplete list of inventory hosts.
+    Limited to the hosts of the section, when one is selected.
+    """
+    try:
+        index = get_inventory_index()
+    except Exception as e:
+        logger.error(f'Autocomplete generation KO [{e}]')
+        return []
+
+    section = ctx.options.get("section")
+    if section and section in inventory.groups:
+        return get_section_hosts_index(index, section).search(ctx.value)
+    return index['hosts'].search(ctx.value)
+
+
 async def get_playbook_list(ctx: discord.AutocompleteContext):
     """ Function to build and serve an Autocomplete list of Ansible Playbooks. """
-    playbook_list = []
-
     if not os.path.isdir(ANSIBLE_PLAYBOOK_FOLDER):
         msg = f'ANSIBLE_PLAYBOOK_FOLDER does dot exists ({ANSIBLE_PLAYBOOK_FOLDER})'
         logger.warning(msg)
-        return playbook_list
+        return []
 
     try:
-        playbooks = os.listdir(ANSIBLE_PLAYBOOK_FOLDER)
+        # Served from memory, the folder is only scanned again from time to time
+        await catalogue.refresh()
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
-    else:
-        if playbooks is None or len(playbooks) == 0:
-            return []
-        else:
-            for playbook in playbooks:
-                playbook_list.append(
-                    discord.OptionChoice(
-                        f"📝 {playbook}",
-                        value=playbook,
-                        )
-                    )
-            return playbook_list
+
+    # With several Playbooks, only the last one is completed
+    head, _, value = (ctx.value or '').rpartition(',')
+    choices = catalogue.index.search(value)
+    if head.strip() == '':
+        return choices
+    # Choice values are limited to 100 characters: longer lists must be typed
+    values = [f'{head.strip()},{choice.value}' for choice in choices]
+    return [
+        discord.OptionChoice(value, value=value)
+        for value in values
+        if len(value) <= 100
+        ]
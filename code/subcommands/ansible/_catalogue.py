@@ -0,0 +1,251 @@
+# -*- coding: utf8 -*-
+
+"""Module to keep an indexed catalogue of the Ansible Playbooks."""
+
+import asyncio
+import os
+import textwrap
+import time
+
+import discord
+import yaml
+
+from loguru import logger
+
+from variables import (
+    ANSIBLE_PLAYBOOK_FOLDER,
+)
+
+from utils.matcher import ChoiceIndex
+
+from ._inventory import inventory
+
+# The folder is scanned again at most once per interval, not per keystroke
+CATALOGUE_CHECK_INTERVAL = 5
+PLAYBOOK_EXTENSIONS = ('.yml', '.yaml')
+# Playbooks per command (Discord accepts up to 10 embeds per message)
+PLAYBOOKS_PER_RUN = 10
+# Folders holding roles, vars, ... but no Playbooks
+SKIPPED_FOLDERS = {
+    '.git',
+    'defaults',
+    'files',
+    'group_vars',
+    'handlers',
+    'host_vars',
+    'meta',
+    'roles',
+    'tasks',
+    'templates',
+    'vars',
+    }
+# Keys that make a YAML list item a play
+PLAY_KEYS = ('hosts', 'import_playbook', 'ansible.builtin.import_playbook')
+# Keys of a play holding tasks (and blocks of tasks)
+TASK_KEYS = ('pre_tasks', 'tasks', 'post_tasks', 'handlers', 'block', 'rescue', 'always')
+
+
+class PlaybookLoader(yaml.SafeLoader):  # pylint: disable=too-many-ancestors
+    """ SafeLoader ignoring Ansible custom tags (!vault, !unsafe, ...). """
+
+
+PlaybookLoader.add_multi_constructor('!', lambda loader, suffix, node: None)
+
+
+class Playbook:
+    """ A Playbook file and the metadata parsed from it. """
+    def __init__(self, path, name, hosts, tags):
+        self.path = path
+        self.name = name
+        self.hosts = hosts
+        self.tags = tags
+
+
+def _as_list(value):
+    """ Ansible accepts a single value or a list of values. """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(item).strip() for item in str(value).split(',')]
+
+
+def _collect_tags(items, tags):
+    """ Collects the tags of tasks and roles, blocks included. """
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        for tag in _as_list(item.get('tags')):
+            tags[tag] = None
+        for key in TASK_KEYS:
+            if isinstance(item.get(key), list):
+                _collect_tags(item[key], tags)
+
+
+def parse_playbook(path, relpath):
+    """
+    Parses a YAML file and returns a Playbook.
+    Returns None if the file is not a Playbook (vars, tasks, inventory, ...).
+    """
+    with open(path, 'r', encoding='utf8') as playbookfile:
+        plays = yaml.load(playbookfile, Loader=PlaybookLoader)  # nosec: SafeLoader
+
+    if not isinstance(plays, list) or len(plays) == 0:
+        return None
+    if not all(isinstance(play, dict) and any(key in play for key in PLAY_KEYS) for play in plays):
+        return None
+
+    hosts = {}
+    tags = {}
+    for play in plays:
+        for host in _as_list(play.get('hosts')):
+            hosts[host] = None
+        for tag in _as_list(play.get('tags')):
+            tags[tag] = None
+        _collect_tags(play.get('roles'), tags)
+        for key in TASK_KEYS:
+            if isinstance(play.get(key), list):
+                _collect_tags(play[key], tags)
+
+    return Playbook(
+        path=relpath,
+        name=plays[0].get('name') or relpath,
+        hosts=list(hosts),
+        tags=list(tags),
+        )
+
+
+class PlaybookCatalogue:
+    """
+    Playbooks of a folder (recursively), with their metadata.
+    Files are parsed again only when they changed (mtime/size).
+    """
+    def __init__(self, folder):
+        self.folder = folder
+        self.checked_at = 0
+        self.files = {}  # {relpath: (signature, Playbook or None)}
+        self.playbooks = {}  # {relpath: Playbook}, sorted
+        self.index = ChoiceIndex([])
+        self.lock = None
+
+    def _scan(self):
+        """ Walks the folder and parses new/changed files (blocking). """
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(self.folder):
+            dirnames[:] = sorted(
+                dirname for dirname in dirnames
+                if dirname not in SKIPPED_FOLDERS and not dirname.startswith('.')
+                )
+            for filename in filenames:
+                if not filename.endswith(PLAYBOOK_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(path, self.folder)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Removed while we were walking
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if relpath in self.files and self.files[relpath][0] == signature:
+                    files[relpath] = self.files[relpath]
+                    continue
+
+                try:
+                    playbook = parse_playbook(path, relpath)
+                except Exception as e:
+                    # A broken file should not hide the others
+                    logger.warning(f'Playbook parsing KO ({relpath}) [{e}]')
+                    playbook = None
+                files[relpath] = (signature, playbook)
+        return files
+
+    async def refresh(self):
+        """ Scans the folder again, if not done recently. """
+        if self.lock is None:
+            # Created here to be bound to the running event loop
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            if time.monotonic() - self.checked_at < CATALOGUE_CHECK_INTERVAL:
+                return
+
+            # Parsing hundreds of files should not block the bot
+            files = await asyncio.to_thread(self._scan)
+            self.checked_at = time.monotonic()
+            if files.keys() == self.files.keys() and all(
+                    files[relpath] is self.files[relpath] for relpath in files
+                    ):
+                return
+
+            self.files = files
+            self.playbooks = {
+                relpath: playbook
+                for relpath, (_, playbook) in sorted(files.items())
+                if playbook is not None
+                }
+            self.index = ChoiceIndex(
+                (
+                    discord.OptionChoice(
+                        textwrap.shorten(
+                            f"📝 {playbook.path} ({playbook.name})",
+                            width=100,
+                            placeholder="...",
+                            ),
+                        value=playbook.path,
+                        ),
+                    (playbook.path, playbook.name, *playbook.hosts, *playbook.tags),
+                    )
+                for playbook in self.playbooks.values()
+                )
+            logger.debug(f'Playbook catalogue loaded ({len(self.playbooks)} playbooks)')
+
+
+def get_playbooks(playbook):
+    """
+    Splits the comma-separated `playbook` option, and checks the files.
+    Raises ValueError with a message for the user.
+    """
+    playbooks = list(dict.fromkeys(
+        item.strip() for item in (playbook or '').split(',') if item.strip()
+        ))
+    if len(playbooks) == 0:
+        raise ValueError('Check that you provided all variables: \n - `playbook` \n')
+    if len(playbooks) > PLAYBOOKS_PER_RUN:
+        raise ValueError(f'Too many Playbooks (max {PLAYBOOKS_PER_RUN})')
+    for item in playbooks:
+        playbook_path = f"{ANSIBLE_PLAYBOOK_FOLDER}/{item}"
+        if not os.path.isfile(playbook_path):
+            raise ValueError(f'Playbook does not exists ({playbook_path})')
+    return playbooks
+
+
+def get_job_hosts(playbooks, limit):
+    """
+    Returns the inventory hosts a run of `playbooks` (with `limit`) can touch,
+    from the `hosts:` of their plays. Call catalogue.refresh() before.
+    Used to serialize only the Jobs sharing some hosts.
+    Returns None when the hosts cannot be known from the inventory.
+    """
+    # The inventory is only parsed again if the file changed
+    inventory.refresh()
+    hosts = set()
+    for item in playbooks:
+        playbook = catalogue.playbooks.get(item)
+        if playbook is None or len(playbook.hosts) == 0:
+            # Not parsed, or only made of import_playbook: any host can be touched
+            hosts |= inventory.match('all')
+            continue
+        for pattern in playbook.hosts:
+            hosts |= inventory.match(pattern)
+    if limit:
+        limited = inventory.match(limit)
+        if limited.isdisjoint(inventory.host_groups):
+            # Nothing we know of: we cannot tell which Jobs it conflicts with
+            return None
+        hosts &= limited
+    return hosts
+
+
+# Shared by every Ansible command
+catalogue = PlaybookCatalogue(ANSIBLE_PLAYBOOK_FOLDER)
@@ -0,0 +1,428 @@
+# -*- coding: utf8 -*-
+
+"""Module to keep the Ansible inventory parsed in memory."""
+
+import asyncio
+import configparser
+import fcntl
+import fnmatch
+import os
+import re
+import shutil
+import tempfile
+
+from loguru import logger
+
+from variables import (
+    ANSIBLE_HOSTS_FILE,
+)
+
+# Hosts can be given separated by commas and/or spaces
+HOST_SEPARATORS = re.compile(r'[\s,]+')
+# Ansible host ranges: web[01:40].example, db-[a:f], node[0:20:5]
+HOST_RANGE = re.compile(r'\[([0-9]+|[a-zA-Z]):([0-9]+|[a-zA-Z])(?::([0-9]+))?\]')
+# Upper bound of hosts a single pattern can expand to, against typos
+HOST_PATTERN_LIMIT = 1000
+# IPv6 addresses are not split on ':' in host patterns
+IPV6_ADDRESS = re.compile(r'^[0-9a-fA-F]*:[0-9a-fA-F]*:[0-9a-fA-F:]*$')
+# ':' separates host pattern terms, except inside subscripts
+LEGACY_SEPARATOR = re.compile(r':(?![^\[]*\])')
+
+
+def expand_hosts(patterns):
+    """
+    Expands a list of hosts patterns (ranges included) into hosts names.
+    Globs (*, ?) are kept as is, to be matched against the inventory.
+    Duplicates are removed, order is preserved.
+    """
+    hosts = {}
+    for pattern in HOST_SEPARATORS.split(patterns.strip()):
+        if pattern == '':
+            continue
+        # Sized before being built: a typo must not expand to millions of hosts
+        size = 1
+        for match in HOST_RANGE.finditer(pattern):
+            size *= len(_parse_range(match)[0])
+        if len(hosts) + size > HOST_PATTERN_LIMIT:
+            raise ValueError(f'Too many hosts (more than {HOST_PATTERN_LIMIT})')
+        for host in _expand_range(pattern):
+            hosts[host] = None
+    return list(hosts)
+
+
+def _parse_range(match):
+    """
+    Returns the values of a range as a `range` (sized without being built),
+    and the function formatting each value.
+    """
+    start, end, step = match.groups()
+    step = int(step or 1)
+    if start.isdigit() and end.isdigit():
+        if int(start) > int(end) or step == 0:
+            raise ValueError(f'Invalid host range (`{match.group(0)}`)')
+        # Leading zeros set the width, as Ansible does (web[01:40])
+        width = len(start) if start.startswith('0') else 0
+        return range(int(start), int(end) + 1, step), lambda value: str(value).zfill(width)
+    if start.isalpha() and end.isalpha():
+        if start > end or step == 0:
+            raise ValueError(f'Invalid host range (`{match.group(0)}`)')
+        return range(ord(start), ord(end) + 1, step), chr
+    raise ValueError(f'Invalid host range (`{match.group(0)}`)')
+
+
+def _expand_range(pattern):
+    """ Expands the first range of a pattern, and recursively the rest. """
+    match = HOST_RANGE.search(pattern)
+    if match is None:
+        return [pattern]
+
+    values, format_value = _parse_range(match)
+    head, tail = pattern[:match.start()], pattern[match.end():]
+    return [
+        f'{head}{format_value(value)}{rest}'
+        for value in values
+        for rest in _expand_range(tail)
+        ]
+
+
+def is_glob(host):
+    """ Tells if a host name is a glob, to be matched against the inventory. """
+    return '*' in host or '?' in host
+
+
+def parse_inventory(text):
+    """ Parses an INI inventory as Ansible does, and returns a ConfigParser. """
+    config = configparser.ConfigParser(
+        allow_no_value=True,
+        # "host ansible_host=1.2.3.4" and IPv6 hosts must survive a write
+        delimiters=('=',),
+        interpolation=None,
+        # Ansible merges repeated sections
+        strict=False,
+        )
+    # Host names are case sensitive
+    config.optionxform = str
+    try:
+        config.read_string(text)
+    except configparser.MissingSectionHeaderError:
+        # Ansible puts the hosts before the first section in "ungrouped"
+        config.read_string(f'[ungrouped]\n{text}')
+    return config
+
+
+class Inventory:
+    """
+    ANSIBLE_HOSTS_FILE, parsed once and reloaded only when the file changes.
+    Call refresh() before reading it.
+    - groups: {group: {host: None}} (ordered, O(1) lookups)
+    - children: {group: {child_group: None}} (from [group:children] sections)
+    - host_groups: {host: {group: None}}
+    """
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.config = None
+        self.text = ''
+        self.groups = {}
+        self.children = {}
+        self.host_groups = {}
+        self.lock = None
+        self.pending = []
+        self.flusher = None
+
+    def refresh(self):
+        """ Reloads the file if it changed (mtime/size) since the last load. """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            signature = None
+        else:
+            signature = (stat.st_mtime_ns, stat.st_size)
+
+        if signature == self.signature and self.config is not None:
+            return
+
+        text = self._read() if signature is not None else ''
+        config = parse_inventory(text)
+        self._load(config)
+        self.text = text
+        self.signature = signature
+        logger.debug(f'Ansible inventory loaded ({len(self.host_groups)} hosts)')
+
+    def _read(self):
+        """ Returns the contents of the file. """
+        with open(self.path, 'r', encoding='utf8') as hostsfile:
+            return hostsfile.read()
+
+    def _load(self, config):
+        """ Builds the lookup tables from a ConfigParser. """
+        groups = {}
+        children = {}
+        host_groups = {}
+        for section in config.sections():
+            group, _, kind = section.partition(':')
+            if kind == 'vars':
+                continue
+            if kind == 'children':
+                children.setdefault(group, {})
+                for child in config.options(section):
+                    children[group][child] = None
+                    groups.setdefault(child, {})
+                groups.setdefault(group, {})
+                continue
+
+            groups.setdefault(group, {})
+            for option in config.options(section):
+                # Hosts can carry inline vars: "host ansible_host=1.2.3.4"
+                host = option.split()[0]
+                groups[group][host] = None
+                host_groups.setdefault(host, {})[group] = None
+
+        for host, host_group in host_groups.items():
+            if set(host_group) <= {'all', 'ungrouped'}:
+                # As Ansible does, hosts of no other group are "ungrouped"
+                groups.setdefault('ungrouped', {})[host] = None
+                host_group['ungrouped'] = None
+
+        self.config = config
+        self.groups = groups
+        self.children = children
+        self.host_groups = host_groups
+
+    def group_hosts(self, group):
+        """ Returns the hosts of a group, children groups included. """
+        hosts = set()
+        seen = set()
+        pending = [group]
+        while pending:
+            group = pending.pop()
+            if group in seen:
+                # A broken inventory can have loops
+                continue
+            seen.add(group)
+            hosts.update(self.groups.get(group, {}))
+            pending.extend(self.children.get(group, {}))
+        return hosts
+
+    def match(self, pattern):
+        """
+        Returns the hosts targeted by an Ansible host pattern, as Ansible does:
+        groups (children included), hosts, globs, ~regex, &intersection, !exclusion.
+        Patterns resolved at runtime only (templates, @file) match all the hosts.
+        Unknown names are returned as is (hosts outside of the inventory).
+        """
+        all_hosts = set(self.host_groups)
+        if '{{' in pattern or pattern.startswith('@'):
+            return all_hosts
+
+        terms = [term.strip() for term in pattern.split(',') if term.strip()]
+        if len(terms) == 1 and not IPV6_ADDRESS.match(terms[0]):
+            # "web:&prod" is the legacy form of "web,&prod"
+            # Subscripts (web[0:1]) are not split
+            terms = [term for term in LEGACY_SEPARATOR.split(terms[0]) if term]
+
+        included = [term for term in terms if term[0] not in '&!']
+        hosts = set().union(*(self._match_term(term) for term in included))
+        if len(included) == 0:
+            hosts = all_hosts
+        for term in terms:
+            if term[0] == '&':
+                hosts &= self._match_term(term[1:])
+        for term in terms:
+            if term[0] == '!':
+                hosts -= self._match_term(term[1:])
+        return hosts
+
+    def _match_term(self, term):
+        """ Returns the hosts of a single pattern term. """
+        # Subscripts (web[0:2]) select part of a group: we take all of it
+        term = re.sub(r'\[[0-9:-]*\]$', '', term)
+        if term in ('all', '*'):
+            return set(self.host_groups)
+        if term in self.groups:
+            return self.group_hosts(term)
+        if term in self.host_groups:
+            return {term}
+        if term.startswith('~'):
+            regex = re.compile(term[1:])
+            groups = [group for group in self.groups if regex.search(group)]
+            hosts = {host for host in self.host_groups if regex.search(host)}
+        elif is_glob(term):
+            groups = fnmatch.filter(self.groups, term)
+            hosts = set(fnmatch.filter(self.host_groups, term))
+        else:
+            return {term}
+        for group in groups:
+            hosts |= self.group_hosts(group)
+        return hosts
+
+    async def update(self, mutate):
+        """
+        Applies `mutate(config)` to the inventory and writes it to the file.
+        Updates requested while a write is running are batched in the next one,
+        so N concurrent updates cost one or two writes, not N.
+        Returns what `mutate` returned, or raises what it raised.
+        """
+        if self.lock is None:
+            # Created here to be bound to the running event loop
+            self.lock = asyncio.Lock()
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((mutate, future))
+        if self.flusher is None:
+            self.flusher = asyncio.ensure_future(self._flush())
+        return await future
+
+    async def _flush(self):
+        """ Applies and writes all the pending updates at once. """
+        async with self.lock:
+            # Updates requested from now on will wait for the next flush
+            batch, self.pending = self.pending, []
+            self.flusher = None
+
+            try:
+                # Waiting for another process to release the file lock,
+                # and writing the file, must not freeze the bot
+                results = await asyncio.to_thread(self._apply, batch)
+                # The in-memory inventory is only updated from the event loop
+                self.refresh()
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+
+            for (_, future), (result, error) in zip(batch, results):
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+            logger.debug(f'Ansible inventory written ({len(batch)} updates)')
+
+    def _apply(self, batch):
+        """
+        Applies a batch of updates to the file, under file lock (blocking).
+        Works on its own ConfigParser, the shared one is left untouched.
+        Returns a list of (result, exception), one per update.
+        """
+        with open(f'{self.path}.lock', 'a', encoding='utf8') as lockfile:
+            # Also protects against other processes editing the file
+            fcntl.flock(lockfile, fcntl.LOCK_EX)
+            # We start from the file as it is now
+            config = parse_inventory(self._read() if os.path.isfile(self.path) else '')
+            results = []
+            for mutate, _ in batch:
+                try:
+                    results.append((mutate(config), None))
+                except Exception as e:
+                    results.append((None, e))
+            if any(error is None for _, error in results):
+                self._write(config)
+        return results
+
+    def _write(self, config):
+        """ Writes a ConfigParser to the file atomically. """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.hosts.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf8') as tmpfile:
+                config.write(tmpfile, space_around_delimiters=False)
+                tmpfile.flush()
+                os.fsync(tmpfile.fileno())
+            if os.path.isfile(self.path):
+                shutil.copymode(self.path, tmp_path)
+            else:
+                os.chmod(tmp_path, 0o644)
+            # Readers either see the old file or the new one, never a partial one
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def render_graph(self):
+        """ Returns the same tree as `ansible-inventory --graph`, without ansible. """
+        # [all:children] only lists top groups, "all" is the root
+        nested = {
+            child
+            for group, kids in self.children.items() if group != 'all'
+            for child in kids
+            }
+        top_groups = [
+            group for group in self.groups
+            if group not in nested and group not in ('all', 'ungrouped')
+            ]
+
+        lines = ['@all:']
+        for group in sorted(top_groups + ['ungrouped']):
+            lines.extend(self._graph_group(group, 1))
+        return '\n'.join(lines)
+
+    def _graph_group(self, group, depth):
+        lines = [f"{'  |' * depth}--@{group}:"]
+        for child in sorted(self.children.get(group, {})):
+            lines.extend(self._graph_group(child, depth + 1))
+        for host in sorted(self.groups.get(group, {})):
+            lines.append(f"{'  |' * (depth + 1)}--{host}")
+        return lines
+
+
+def _section_hosts(config, section):
+    """
+    Returns {host: [option]} for a section.
+    Hosts can carry inline vars: the option of "web1 ansible_host=1.2.3.4"
+    is "web1 ansible_host", its host is "web1".
+    """
+    hosts = {}
+    for option in config.options(section):
+        hosts.setdefault(option.split()[0], []).append(option)
+    return hosts
+
+
+def assign_hosts(config, section, hosts):
+    """
+    Assigns hosts in a section (created if needed).
+    Returns (assigned, already present) hosts.
+    """
+    if not config.has_section(section):
+        config.add_section(section)
+    section_hosts = _section_hosts(config, section)
+    assigned = []
+    present = []
+    for host in hosts:
+        if host in section_hosts:
+            present.append(host)
+        else:
+            config.set(section, host, None)
+            section_hosts[host] = [host]
+            assigned.append(host)
+    return assigned, present
+
+
+def remove_hosts(config, section, hosts):
+    """
+    Removes hosts (globs included) from a section, inline vars included.
+    Returns (removed, not found) hosts.
+    """
+    if not config.has_section(section):
+        raise LookupError(f'Section not found (`[{section}]`)')
+    section_hosts = _section_hosts(config, section)
+    removed = {}
+    missing = []
+    for host in hosts:
+        if is_glob(host):
+            matches = fnmatch.filter(section_hosts, host)
+        else:
+            matches = [host] if host in section_hosts else []
+        if len(matches) == 0:
+            missing.append(host)
+        for match in matches:
+            for option in section_hosts.pop(match):
+                config.remove_option(section, option)
+            removed[match] = None
+    if len(removed) == 0:
+        raise LookupError(f'Host not found (`{", ".join(hosts)}` in `[{section}]`)')
+    return list(removed), missing
+
+
+# Shared by every Ansible command
+inventory = Inventory(ANSIBLE_HOSTS_FILE)
@@ -0,0 +1,91 @@
+# -*- coding: utf8 -*-
+
+"""Module to manage the ansible.cfg profiles used by the bot."""
+
+import configparser
+import io
+import os
+
+from loguru import logger
+
+from variables import (
+    ANSIBLE_FORKS,
+    ANSIBLE_PROFILE_FOLDER,
+)
+
+# Sockets of the persistent SSH connections, reused between tasks and runs
+CONTROL_PATH_DIR = f'{ANSIBLE_PROFILE_FOLDER}/cp'
+# Gathered facts, reused between runs (gathering = smart)
+FACT_CACHE_DIR = f'{ANSIBLE_PROFILE_FOLDER}/facts'
+
+# ansible.cfg sections per profile
+# - default: no managed ansible.cfg, Ansible defaults apply
+# - persist: SSH ControlPersist + fact caching (safe with sudo requiretty)
+# - tuned: persist + pipelining (fewer SSH operations per task)
+PROFILES = {
+    'default': None,
+    'persist': {
+        'defaults': {
+            'forks': str(ANSIBLE_FORKS),
+            'gathering': 'smart',
+            'fact_caching': 'jsonfile',
+            'fact_caching_connection': FACT_CACHE_DIR,
+            'fact_caching_timeout': '86400',
+            },
+        'ssh_connection': {
+            'ssh_args': '-o ControlMaster=auto -o ControlPersist=120s',
+            'control_path_dir': CONTROL_PATH_DIR,
+            },
+        },
+    'tuned': {
+        'defaults': {
+            'forks': str(ANSIBLE_FORKS),
+            'gathering': 'smart',
+            'fact_caching': 'jsonfile',
+            'fact_caching_connection': FACT_CACHE_DIR,
+            'fact_caching_timeout': '86400',
+            },
+        'ssh_connection': {
+            'pipelining': 'True',
+            'ssh_args': '-o ControlMaster=auto -o ControlPersist=120s',
+            'control_path_dir': CONTROL_PATH_DIR,
+            },
+        },
+    }
+
+
+def render_profile(profile):
+    """ Renders the ansible.cfg of a profile. """
+    config = configparser.ConfigParser()
+    config.read_dict(PROFILES[profile])
+    text = io.StringIO()
+    config.write(text)
+    return f'# Managed by imabot, changes will be overwritten\n{text.getvalue()}'
+
+
+def get_profile_env(profile):
+    """
+    Function to get the environment of the Ansible commands for a profile.
+    The profile ansible.cfg (and its folders) are written if needed.
+    Returns None for the default profile (environment inherited as is).
+    Raises KeyError for unknown profiles.
+    """
+    if PROFILES[profile] is None:
+        return None
+
+    path = f'{ANSIBLE_PROFILE_FOLDER}/{profile}.cfg'
+    text = render_profile(profile)
+    for folder in (ANSIBLE_PROFILE_FOLDER, CONTROL_PATH_DIR, FACT_CACHE_DIR):
+        os.makedirs(folder, mode=0o700, exist_ok=True)
+
+    try:
+        with open(path, 'r', encoding='utf8') as cfgfile:
+            current = cfgfile.read()
+    except FileNotFoundError:
+        current = None
+    if current != text:
+        with open(path, 'w', encoding='utf8') as cfgfile:
+            cfgfile.write(text)
+        logger.debug(f'Ansible profile written ({path})')
+
+    return {**os.environ, 'ANSIBLE_CONFIG': path}
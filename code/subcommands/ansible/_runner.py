@@ -0,0 +1,370 @@
+# -*- coding: utf8 -*-
+
+"""Module to run Ansible commands without blocking the bot."""
+
+import asyncio
+import collections
+import json
+import re
+import time
+
+import discord
+
+from loguru import logger
+
+from variables import (
+    ANSIBLE_FORKS,
+    ANSIBLE_HOSTS_FILE,
+    ANSIBLE_PARALLEL_PLAYBOOKS,
+    ANSIBLE_PLAYBOOK_FOLDER,
+)
+
+from utils.concurrency import gather_bounded
+
+# Seconds between two Discord message edits while a command runs
+UPDATE_INTERVAL = 3
+# Lines of output kept for display
+TAIL_LINES = 25
+# Embed descriptions are limited to 4096 characters
+TAIL_CHARS = 3000
+# All the embeds of a message are limited to 6000 characters (footer included)
+EMBEDS_CHARS = 5800
+# Waiting for new hosts to answer (seconds): first delay, max delay, timeout
+HOSTS_WAIT_DELAY = 10
+HOSTS_WAIT_MAX_DELAY = 60
+HOSTS_WAIT_TIMEOUT = 600
+
+TASK_LINE = re.compile(r'^(?:TASK|RUNNING HANDLER) \[(?P<task>.*)\]')
+HOST_LINE = re.compile(
+    r'^(?P<status>ok|changed|skipping|failed|fatal|unreachable): \[(?P<host>[^\]]+)\]'
+    )
+# Ad-hoc commands output, with --one-line:
+# host | SUCCESS => {"changed": false, "ping": "pong"}
+# host | UNREACHABLE!: Failed to connect to the host via ssh
+ONE_LINE = re.compile(
+    r'^(?P<host>\S+) \| (?P<status>SUCCESS|CHANGED|FAILED!|UNREACHABLE!)'
+    r'(?: \| rc=\d+)?(?: =>|:) ?(?P<result>.*)$'
+    )
+# PLAY RECAP lines:
+# host : ok=2 changed=1 unreachable=0 failed=0 skipped=0 rescued=0 ignored=0
+RECAP_LINE = re.compile(r'^(?P<host>\S+)\s+:\s+(?P<counters>(?:\w+=\d+\s*)+)$')
+RECAP_COUNTER = re.compile(r'(\w+)=(\d+)')
+HOST_STATUS_EMOJI = {
+    'ok': '✅',
+    'changed': '🔄',
+    'skipping': '⏭️',
+    'failed': '❌',
+    'unreachable': '🔌',
+    }
+
+
+class AnsibleRun:
+    """ Tracks the output of a running Ansible command. """
+    def __init__(self, title):
+        self.title = title
+        self.tail = collections.deque(maxlen=TAIL_LINES)
+        self.output = []
+        self.task = None
+        self.hosts = {}
+        self.recap = {}
+        self.in_recap = False
+        self.skipped = False
+        self.returncode = None
+
+    def feed(self, line):
+        """ Parses one line of output. """
+        self.output.append(line)
+        self.tail.append(line)
+
+        if line.startswith('PLAY RECAP'):
+            self.in_recap = True
+            return
+        if self.in_recap:
+            m = RECAP_LINE.match(line)
+            if m is not None:
+                self.recap[m.group('host')] = {
+                    counter: int(value)
+                    for counter, value in RECAP_COUNTER.findall(m.group('counters'))
+                    }
+                return
+
+        m = TASK_LINE.match(line)
+        if m is not None:
+            self.task = m.group('task')
+            return
+
+        m = HOST_LINE.match(line)
+        if m is not None:
+            status = m.group('status')
+            if status == 'fatal':
+                status = 'unreachable' if 'UNREACHABLE!' in line else 'failed'
+            self.hosts[m.group('host')] = status
+
+    def summary(self):
+        """ Renders the PLAY RECAP as totals, and the hosts in trouble. """
+        totals = collections.Counter()
+        for counters in self.recap.values():
+            totals.update(counters)
+        summary = (
+            f'```hosts={len(self.recap)} ' +
+            ' '.join(
+                f'{counter}={totals[counter]}'
+                for counter in ('ok', 'changed', 'unreachable', 'failed')
+                ) +
+            '```'
+            )
+        for counter in ('unreachable', 'failed'):
+            hosts = sorted(host for host, counters in self.recap.items() if counters.get(counter))
+            if hosts:
+                summary += f"\n{HOST_STATUS_EMOJI[counter]} {counter}: `{', '.join(hosts)}`"
+        return summary
+
+    def embed(self, budget=EMBEDS_CHARS):
+        """
+        Renders the current state as a Discord Embed of at most `budget` characters
+        (as Discord counts them: title, description, fields).
+        The recap (or hosts) field gets up to a third, the output tail the rest.
+        """
+        if self.skipped:
+            colour = discord.Colour.light_grey()
+            state = '⏭️ Skipped'
+        elif self.returncode is None and not self.output:
+            colour = discord.Colour.light_grey()
+            state = '⏸️ Waiting'
+        elif self.returncode is None:
+            colour = discord.Colour.blue()
+            state = f'⏳ Running: `{self.task[:60]}`' if self.task else '⏳ Running'
+        elif self.returncode == 0:
+            colour = discord.Colour.green()
+            state = '✅ Done'
+        else:
+            colour = discord.Colour.red()
+            state = f'❌ Failed (rc={self.returncode})'
+
+        if self.recap:
+            field_name, field_value = 'Recap', self.summary()
+        elif self.hosts:
+            field_name, field_value = 'Hosts', '\n'.join(
+                f'{HOST_STATUS_EMOJI.get(status, "")} `{host}`: {status}'
+                for host, status in sorted(self.hosts.items())
+                )
+        else:
+            field_name, field_value = None, ''
+
+        title = self.title[:100]
+        budget -= len(title) + len(f'{state}\n```\n\n```')
+        field_chars = min(1024, budget // 3 - len(field_name or ''))
+        if field_name is not None and field_chars > 0:
+            field_value = field_value[:field_chars]
+            budget -= len(field_name) + len(field_value)
+        else:
+            field_name = None
+        tail_chars = min(TAIL_CHARS, budget)
+        tail = '\n'.join(self.tail)[-tail_chars:] if tail_chars > 0 else ''
+
+        embed = discord.Embed(
+            title=title,
+            description=f'{state}\n```\n{tail}\n```',
+            colour=colour,
+            )
+        if field_name is not None:
+            embed.add_field(
+                name=field_name,
+                value=field_value,
+                inline=False,
+                )
+        return embed
+
+
+def get_command(playbook, limit, tags, forks):
+    """ Builds the ansible-playbook command line of a Playbook. """
+    command = [
+        "ansible-playbook",
+        f"--inventory-file={ANSIBLE_HOSTS_FILE}",
+        "--user=ansible",
+        f"--forks={forks or ANSIBLE_FORKS}",
+        ]
+    if limit:
+        command.append(f"--limit={limit}")
+    if tags:
+        command.append(f"--tags={tags}")
+    command.append(f"{ANSIBLE_PLAYBOOK_FOLDER}/{playbook}")
+    return command
+
+
+async def run_ansible(command, title, on_update=None, run=None, env=None):
+    """
+    Function to run an Ansible command in an asyncio subprocess.
+    Output is parsed line by line (in `run`, if given), and `on_update(run)`
+    is awaited at most every UPDATE_INTERVAL seconds while the command runs.
+    `env` is the environment of the command (see get_profile_env).
+    """
+    if run is None:
+        run = AnsibleRun(title)
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        # Some modules output long JSON lines
+        limit=2**20,
+        env=env,
+        )
+
+    loop = asyncio.get_running_loop()
+    last_update = loop.time()
+    async for line in process.stdout:
+        run.feed(line.decode('utf8', errors='replace').rstrip())
+        if on_update is not None and loop.time() - last_update >= UPDATE_INTERVAL:
+            last_update = loop.time()
+            try:
+                await on_update(run)
+            except Exception as e:
+                # A failed Discord edit must not kill the command
+                logger.warning(f'Ansible progress update KO [{e}]')
+
+    run.returncode = await process.wait()
+    return run
+
+
+async def run_ansible_job(job, commands, edit, parallel=False, env=None):
+    """
+    Function to run Ansible commands as a background Job.
+    `commands` is a list of (title, command), run one after the other
+    (stopping at the first failure), or at the same time if `parallel`.
+    Progress is reported in job.output and in a Discord message, through
+    `edit` (interaction.edit_original_response, message.edit, ...).
+    Raises when a command fails, so the Job is marked as failed.
+    """
+    runs = [AnsibleRun(title) for title, _ in commands]
+    # All the runs share one message
+    footer = f'Job #{job.id}'
+    budget = (EMBEDS_CHARS - len(footer)) // len(runs)
+    loop = asyncio.get_running_loop()
+    last_update = loop.time()
+
+    def render():
+        embeds = [run.embed(budget) for run in runs]
+        embeds[-1].set_footer(text=footer)
+        return embeds
+
+    async def on_update(_):
+        nonlocal last_update
+        job.output = '\n'.join(
+            f'== {run.title} ==\n' + '\n'.join(run.tail) for run in runs if run.output
+            )
+        # Concurrent runs share the same message, hence the same pace
+        if loop.time() - last_update < UPDATE_INTERVAL:
+            return
+        last_update = loop.time()
+        await edit(embeds=render())
+
+    # The runs are fed by run_ansible, we only keep them for rendering
+    async def execute_run(index):
+        title, command = commands[index]
+        done = await run_ansible(
+            command,
+            title,
+            on_update=on_update,
+            run=runs[index],
+            env=env,
+            )
+        return done.returncode
+
+    if parallel:
+        returncodes = await gather_bounded(
+            (execute_run(index) for index in range(len(runs))),
+            limit=ANSIBLE_PARALLEL_PLAYBOOKS,
+            )
+    else:
+        returncodes = []
+        for index in range(len(runs)):
+            returncodes.append(await execute_run(index))
+            if returncodes[-1] != 0:
+                # Next Playbooks may rely on this one
+                for run in runs[index + 1:]:
+                    run.skipped = True
+                break
+
+    job.output = '\n'.join(
+        f'== {run.title} ==\n' + '\n'.join(run.output) for run in runs if run.output
+        )
+    try:
+        await edit(embeds=render())
+    except Exception as e:
+        # The interaction/followup may have expired (15 minutes)
+        logger.warning(f'Job #{job.id} Discord update KO [{e}]')
+
+    failed = len([returncode for returncode in returncodes if returncode != 0])
+    if failed > 0:
+        raise RuntimeError(f'{failed}/{len(runs)} command(s) failed')
+
+
+async def ping_hosts(inventory, pattern, forks, env=None):
+    """
+    Function to run the Ansible ping module against `pattern`.
+    Per-host results are parsed as they are printed (JSON, one line per host).
+    The elapsed time of a host is counted from the start of the command, so it
+    includes ansible startup and the wait for a fork: it is not the host latency.
+    Returns a list of (host, status, elapsed, message), sorted by host.
+    """
+    process = await asyncio.create_subprocess_exec(
+        "ansible",
+        f"--inventory-file={inventory}",
+        pattern,
+        "--module-name=ping",
+        "--user=ansible",
+        f"--forks={forks}",
+        "--one-line",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        limit=2**20,
+        env=env,
+        )
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    results = {}
+    async for line in process.stdout:
+        m = ONE_LINE.match(line.decode('utf8', errors='replace').rstrip())
+        if m is None:
+            continue
+
+        elapsed = loop.time() - started_at
+        message = m.group('result')
+        try:
+            result = json.loads(message)
+        except ValueError:
+            result = {}
+        else:
+            message = result.get('msg', '')
+
+        if result.get('ping') == 'pong':
+            status = 'ok'
+        else:
+            status = m.group('status').rstrip('!').lower()
+        results[m.group('host')] = (status, elapsed, message)
+
+    await process.wait()
+    return [(host, *result) for host, result in sorted(results.items())]
+
+
+async def wait_for_hosts(inventory, pattern, env=None):
+    """
+    Function to ping `pattern` (with backoff) until all its hosts answer.
+    Used for new hosts, reachable only once booted and set up by cloud-init.
+    Returns the last ping results. Raises if some hosts still do not answer.
+    """
+    deadline = time.monotonic() + HOSTS_WAIT_TIMEOUT
+    delay = HOSTS_WAIT_DELAY
+    while True:
+        results = await ping_hosts(inventory, pattern, ANSIBLE_FORKS, env=env)
+        missing = [host for host, status, _, _ in results if status != 'ok']
+        if len(results) > 0 and len(missing) == 0:
+            return results
+        if time.monotonic() >= deadline:
+            raise TimeoutError(
+                f'Hosts still not answering after {HOSTS_WAIT_TIMEOUT}s '
+                f"({', '.join(missing) or pattern})"
+                )
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, HOSTS_WAIT_MAX_DELAY)
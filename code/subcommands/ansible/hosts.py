@@ -1,22 +1,52 @@
 """
 Discord command definition for /{DISCORD_GROUP_ANSIBLE} hosts
 """
-import configparser
-import subprocess
-import os.path
+import textwrap
 
 import discord
 
 from discord.commands import option
 from discord.ext import commands
 from loguru import logger
+from tabulate import tabulate
 
 from variables import (
+    ANSIBLE_FORKS,
     ANSIBLE_HOSTS_FILE,
+    ANSIBLE_PROFILE,
     DISCORD_GROUP_ANSIBLE,
     ROLE_TECH_RW,
 )
 
+from utils.embeds import group_embeds
+
+from ._autocomplete import (
+    get_host_list,
+    get_section_list,
+)
+from ._inventory import (
+    assign_hosts,
+    expand_hosts,
+    inventory,
+    is_glob,
+    remove_hosts,
+)
+from ._profiles import (
+    PROFILES,
+    get_profile_env,
+)
+from ._runner import ping_hosts
+
+# Rows of the ping table displayed in each embed
+PING_HOSTS_PER_PAGE = 40
+
+
+def format_hosts(hosts):
+    """ Formats a list of hosts for an embed, shortened if needed. """
+    if len(hosts) == 0:
+        return '-'
+    return '```' + textwrap.shorten(', '.join(hosts), width=1000, placeholder=' ...') + '```'
+
 
 def hosts(group_ansible):
     """
@@ -44,11 +74,24 @@ def hosts(group_ansible):
     @option(
         "section",
         description="Ansible inventory section",
+        autocomplete=get_section_list,
         required=False,
         )
     @option(
         "host",
-        description="Ansible host",
+        description="Ansible host(s): list, range (web[01:40].example), glob to remove",
+        autocomplete=get_host_list,
+        required=False,
+        )
+    @option(
+        "forks",
+        description="Ansible forks (parallel hosts) for ping",
+        required=False,
+        )
+    @option(
+        "profile",
+        description=f"Ansible configuration profile for ping (default: {ANSIBLE_PROFILE})",
+        autocomplete=discord.utils.basic_autocomplete(list(PROFILES)),
         required=False,
         )
     async def hosts(
@@ -56,15 +99,17 @@ def hosts(group_ansible):
         action: str,
         section: str,
         host: str,
+        forks: int,
+        profile: str,
     ):
         """
         This part performs actions on Ansible hosts
         So far:
-        - assign: Assigns a host in section (creates new section if needed)
+        - assign: Assigns hosts in section (creates new section if needed)
         - show: Displays the contents of ANSIBLE_HOSTS_FILE
-        - remove: Removes a host of a section
-        - graph: Displays `ansible --graph` execution
-        - ping: Displays `ansible --ping` execution
+        - remove: Removes hosts of a section
+        - graph: Displays the inventory tree (as `ansible-inventory --graph`)
+        - ping: Displays `ansible --module-name=ping` results, per host
         """
         # As we rely on potentially a lot of API calls, we need time to answer
         await ctx.defer()
@@ -79,9 +124,24 @@ def hosts(group_ansible):
             f'{action} {section} {host}'
             )
 
+        try:
+            # The inventory is only parsed again if the file changed
+            # ping runs ansible on the file directly, it does not need it
+            if action != 'ping':
+                inventory.refresh()
+        except Exception as e:
+            msg = f'ANSIBLE_HOSTS_FILE loading KO [{e}]'
+            logger.error(msg)
+            embed = discord.Embed(
+                description=msg,
+                colour=discord.Colour.red()
+            )
+            await ctx.respond(embed=embed)
+            return
+
         if action == 'show':
             # This command will require basic TECH_RW role, checked before
-            if not os.path.isfile(ANSIBLE_HOSTS_FILE):
+            if inventory.signature is None:
                 msg = f'ANSIBLE_HOSTS_FILE do not exists ({ANSIBLE_HOSTS_FILE})'
                 logger.error(msg)
                 embed = discord.Embed(
@@ -91,16 +151,14 @@ def hosts(group_ansible):
                 await ctx.respond(embed=embed)
                 return
 
-            with open(ANSIBLE_HOSTS_FILE, "r", encoding='utf8') as hostsfile:
-                embed = discord.Embed(
-                    description=(
-                        f'```ini\n'
-                        f'{hostsfile.read()}'
-                        f'\n```'
-                        ),
-                    colour=discord.Colour.green()
-                )
-            hostsfile.close()
+            embed = discord.Embed(
+                description=(
+                    f'```ini\n'
+                    f'{inventory.text}'
+                    f'\n```'
+                    ),
+                colour=discord.Colour.green()
+            )
             await ctx.respond(embed=embed)
             logger.debug(f'[#{channel}][{name}] └──> Queries OK')
         elif action == 'assign':
@@ -119,21 +177,25 @@ def hosts(group_ansible):
                 return
 
             try:
-                config = configparser.ConfigParser(allow_no_value=True)
-                # We check if file exists
-                if not os.path.isfile(ANSIBLE_HOSTS_FILE):
-                    command = "x"
-                else:
-                    command = "w"
-                    # We load
-                    config.read_file(open(ANSIBLE_HOSTS_FILE, 'r', encoding='utf8'))
-                # We add the section if not exists
-                if not config.has_section(section):
-                    config.add_section(section)
-                # We assign the host inside
-                config.set(section, host, None)
-                # We write
-                config.write(open(ANSIBLE_HOSTS_FILE, command, encoding='utf8'))
+                # Lists, ranges (web[01:40].example) are expanded here
+                hosts = expand_hosts(host)
+                if any(is_glob(host) for host in hosts):
+                    raise ValueError('Globs cannot be assigned, only removed')
+            except ValueError as e:
+                msg = f'Invalid `host` [{e}]'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.orange()
+                )
+                await ctx.respond(embed=embed)
+                return
+
+            try:
+                # All the hosts are written at once, batched with concurrent updates
+                assigned, present = await inventory.update(
+                    lambda config: assign_hosts(config, section, hosts)
+                    )
             except Exception as e:
                 msg = f'Host assign KO [{e}]'
                 logger.error(msg)
@@ -145,9 +207,18 @@ def hosts(group_ansible):
                 return
             else:
                 embed = discord.Embed(
-                    description=f'Host `[{host}]` assigned in `[{section}]`',
+                    description=(
+                        f'{len(assigned)} host(s) assigned in `[{section}]`\n'
+                        f'{format_hosts(assigned)}'
+                        ),
                     colour=discord.Colour.green()
                 )
+                if len(present) > 0:
+                    embed.add_field(
+                        name=f'{len(present)} host(s) already assigned',
+                        value=format_hosts(present),
+                        inline=False,
+                        )
                 await ctx.respond(embed=embed)
                 logger.debug(f'[#{channel}][{name}] └──> Queries OK')
         elif action == 'remove':
@@ -166,61 +237,33 @@ def hosts(group_ansible):
                 return
 
             try:
-                config = configparser.ConfigParser(allow_no_value=True)
-                # We load
-                config.read_file(open(ANSIBLE_HOSTS_FILE, 'r', encoding='utf8'))
-                # We check the section exists
-                if not config.has_section(section):
-                    msg = f'Section not found [{e}]'
-                    logger.error(msg)
-                    embed = discord.Embed(
-                        description=msg,
-                        colour=discord.Colour.orange()
-                    )
-                    await ctx.respond(embed=embed)
-                    return
-                # We search for the host
-                if config.has_option(section, host):
-                    # We remove the host
-                    config.remove_option(section, host)
-                else:
-                    msg = f'Host not found [{e}]'
-                    logger.error(msg)
-                    embed = discord.Embed(
-                        description=msg,
-                        colour=discord.Colour.orange()
-                    )
-                    await ctx.respond(embed=embed)
-                    return
-                # We write
-                config.write(open(ANSIBLE_HOSTS_FILE, 'w', encoding='utf8'))
-            except Exception as e:
-                msg = f'Host remove KO [{e}]'
+                # Lists, ranges (web[01:40].example) are expanded here
+                # Globs (web*) are matched against the section when writing
+                hosts = expand_hosts(host)
+            except ValueError as e:
+                msg = f'Invalid `host` [{e}]'
                 logger.error(msg)
                 embed = discord.Embed(
                     description=msg,
-                    colour=discord.Colour.red()
+                    colour=discord.Colour.orange()
                 )
                 await ctx.respond(embed=embed)
                 return
-            else:
+
+            try:
+                # All the hosts are written at once, batched with concurrent updates
+                removed, missing = await inventory.update(
+                    lambda config: remove_hosts(config, section, hosts)
+                    )
+            except LookupError as e:
+                msg = str(e)
+                logger.error(msg)
                 embed = discord.Embed(
-                    description=f'Host `{host}` removed from `[{section}]`',
-                    colour=discord.Colour.green()
+                    description=msg,
+                    colour=discord.Colour.orange()
                 )
                 await ctx.respond(embed=embed)
-                logger.debug(f'[#{channel}][{name}] └──> Queries OK')
-        elif action == 'graph':
-            try:
-                res = subprocess.run(
-                    [
-                        "ansible-inventory",
-                        f"--inventory-file={ANSIBLE_HOSTS_FILE}",
-                        "--graph"
-                        ],
-                    capture_output=True,
-                    check=True
-                    )
+                return
             except Exception as e:
                 msg = f'Host remove KO [{e}]'
                 logger.error(msg)
@@ -233,29 +276,64 @@ def hosts(group_ansible):
             else:
                 embed = discord.Embed(
                     description=(
-                        f'```\n'
-                        f"{res.stdout.decode('ascii')}"
-                        f'\n```'
+                        f'{len(removed)} host(s) removed from `[{section}]`\n'
+                        f'{format_hosts(removed)}'
                         ),
                     colour=discord.Colour.green()
                 )
+                if len(missing) > 0:
+                    embed.add_field(
+                        name=f'{len(missing)} host(s) not found',
+                        value=format_hosts(missing),
+                        inline=False,
+                        )
                 await ctx.respond(embed=embed)
                 logger.debug(f'[#{channel}][{name}] └──> Queries OK')
+        elif action == 'graph':
+            # The graph is built from the parsed inventory, no ansible-inventory call
+            embed = discord.Embed(
+                description=(
+                    f'```\n'
+                    f"{inventory.render_graph()}"
+                    f'\n```'
+                    ),
+                colour=discord.Colour.green()
+            )
+            await ctx.respond(embed=embed)
+            logger.debug(f'[#{channel}][{name}] └──> Queries OK')
         elif action == 'ping':
+            # The pattern defaults to all the hosts of the inventory
+            pattern = section or 'all'
+            try:
+                env = get_profile_env(profile or ANSIBLE_PROFILE)
+            except KeyError:
+                msg = f'Ansible profile not found (`{profile}`)'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.orange()
+                )
+                await ctx.respond(embed=embed)
+                return
+            except Exception as e:
+                msg = f'Ansible profile generation KO [{e}]'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.red()
+                )
+                await ctx.respond(embed=embed)
+                return
+
             try:
-                res = subprocess.run(
-                    [
-                        "ansible",
-                        f"--inventory-file={ANSIBLE_HOSTS_FILE}",
-                        "all",
-                        "--module-name=ping",
-                        "--user=ansible",
-                        ],
-                    capture_output=True,
-                    check=True,
+                results = await ping_hosts(
+                    ANSIBLE_HOSTS_FILE,
+                    pattern,
+                    forks or ANSIBLE_FORKS,
+                    env=env,
                     )
             except Exception as e:
-                msg = f'Host remove KO [{e}]'
+                msg = f'Host ping KO [{e}]'
                 logger.error(msg)
                 embed = discord.Embed(
                     description=msg,
@@ -263,14 +341,55 @@ def hosts(group_ansible):
                 )
                 await ctx.respond(embed=embed)
                 return
-            else:
+
+            if len(results) == 0:
                 embed = discord.Embed(
-                    description=(
-                        f'```\n'
-                        f"{res.stdout.decode('ascii')}"
-                        f'\n```'
-                        ),
-                    colour=discord.Colour.green()
+                    description=f'No host matched `{pattern}`',
+                    colour=discord.Colour.orange()
                 )
                 await ctx.respond(embed=embed)
-                logger.debug(f'[#{channel}][{name}] └──> Queries OK')
+                return
+
+            # One table per page, to stay under the embed size limit
+            hosts_ok = len([result for result in results if result[1] == 'ok'])
+            embeds = []
+            for page in range(0, len(results), PING_HOSTS_PER_PAGE):
+                # We start with the headers
+                embed_field_value_table = {
+                    'Host': [],
+                    'Status': [],
+                    'Elapsed': [],
+                    }
+                for host, status, elapsed, _ in results[page:page + PING_HOSTS_PER_PAGE]:
+                    embed_field_value_table['Host'].append(textwrap.shorten(
+                        host,
+                        width=30,
+                        placeholder="...",
+                        ))
+                    embed_field_value_table['Status'].append(status)
+                    embed_field_value_table['Elapsed'].append(f'{elapsed:.2f}s')
+
+                embeds.append(
+                    discord.Embed(
+                        description=(
+                            '```' +
+                            tabulate(
+                                embed_field_value_table,
+                                headers='keys',
+                                tablefmt='pretty',
+                                stralign='right',
+                                ) +
+                            '```'
+                            ),
+                        colour=(
+                            discord.Colour.green() if hosts_ok == len(results)
+                            else discord.Colour.orange()
+                            ),
+                        )
+                    )
+            embeds[0].title = f'Ping `{pattern}`: {hosts_ok}/{len(results)} OK'
+
+            # Discord accepts up to 10 embeds (6000 characters) per message
+            for group in group_embeds(embeds):
+                await ctx.respond(embeds=group)
+            logger.debug(f'[#{channel}][{name}] └──> Queries OK')
@@ -1,26 +1,51 @@
 """
 Discord command definition for /{DISCORD_GROUP_ANSIBLE} playbook
 """
-import subprocess
 import os.path
+import textwrap
 
 import discord
 
 from discord.commands import option
 from discord.ext import commands
 from loguru import logger
+from tabulate import tabulate
 
 from variables import (
-    ANSIBLE_HOSTS_FILE,
     ANSIBLE_PLAYBOOK_FOLDER,
+    ANSIBLE_PROFILE,
     DISCORD_GROUP_ANSIBLE,
+    DISCORD_GROUP_GENERAL,
     ROLE_TECH_RW,
 )
 
+from utils.embeds import group_embeds
+from utils.jobs import job_manager
+
 from ._autocomplete import (
     get_playbook_list,
+    get_section_list,
+)
+from ._catalogue import (
+    catalogue,
+    get_job_hosts,
+    get_playbooks,
+)
+from ._profiles import (
+    PROFILES,
+    get_profile_env,
+)
+from ._runner import (
+    TAIL_CHARS,
+    get_command,
+    run_ansible,
+    run_ansible_job,
 )
 
+# Rows of the Playbooks table displayed in each embed
+PLAYBOOKS_PER_PAGE = 30
+
+
 def playbook(group_ansible):
     """
     Discord command definition for /{DISCORD_GROUP_ANSIBLE} playbook
@@ -46,22 +71,56 @@ def playbook(group_ansible):
         )
     @option(
         "playbook",
-        description="Ansible Playbook File",
+        description="Ansible Playbook File(s), comma-separated",
         autocomplete=get_playbook_list,
         required=False,
         )
+    @option(
+        "limit",
+        description="Ansible hosts/groups pattern (--limit)",
+        autocomplete=get_section_list,
+        required=False,
+        )
+    @option(
+        "tags",
+        description="Ansible tags, comma-separated (--tags)",
+        required=False,
+        )
+    @option(
+        "forks",
+        description="Ansible forks (parallel hosts)",
+        required=False,
+        )
+    @option(
+        "profile",
+        description=f"Ansible configuration profile (default: {ANSIBLE_PROFILE})",
+        autocomplete=discord.utils.basic_autocomplete(list(PROFILES)),
+        required=False,
+        )
+    @option(
+        "parallel",
+        description="Run the Playbooks at the same time (they must be independent)",
+        required=False,
+        default=False,
+        )
     async def playbook(
         ctx,
         action: str,
         playbook: str,
+        limit: str,
+        tags: str,
+        forks: int,
+        profile: str,
+        parallel: bool,
     ):
         """
         This part performs actions on Ansible Playbooks
         So far:
-        - list: Lists all Playbooks present in ANSIBLE_PLAYBOOK_FOLDER
+        - list: Lists all Playbooks in ANSIBLE_PLAYBOOK_FOLDER (recursively)
         - show: Displays the contents of the selected Playbook
-        - run: Runs the selected Playbook
-        - check: Checks the selected Playbook
+        - run: Runs the selected Playbooks (as a background Job)
+        - check: Checks the selected Playbooks (as a background Job)
+        - hosts: Lists the hosts targeted by the selected Playbooks
         """
         # As we rely on potentially a lot of API calls, we need time to answer
         await ctx.defer()
@@ -73,9 +132,32 @@ def playbook(group_ansible):
         name = ctx.author.name
         logger.info(
             f'[#{channel}][{name}] /{DISCORD_GROUP_ANSIBLE} playbook '
-            f'{action} {playbook}'
+            f'{action} {playbook} {limit} {tags}'
             )
 
+        if action in ('check', 'hosts', 'run'):
+            # Commands get a managed ansible.cfg (pipelining, ControlPersist, ...)
+            try:
+                env = get_profile_env(profile or ANSIBLE_PROFILE)
+            except KeyError:
+                msg = f'Ansible profile not found (`{profile}`)'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.orange()
+                )
+                await ctx.respond(embed=embed)
+                return
+            except Exception as e:
+                msg = f'Ansible profile generation KO [{e}]'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.red()
+                )
+                await ctx.respond(embed=embed)
+                return
+
         if action == 'list':
             # This command will require basic TECH_RW role, checked before
             if not os.path.isdir(ANSIBLE_PLAYBOOK_FOLDER):
@@ -89,19 +171,8 @@ def playbook(group_ansible):
                 return
 
             try:
-                playbooks = os.listdir(ANSIBLE_PLAYBOOK_FOLDER)
-                description = ''
-                for playbook in playbooks:
-                    description += f'`{playbook}`\n'
-
-                embed = discord.Embed(
-                    title=f'**Playbooks**: {ANSIBLE_PLAYBOOK_FOLDER}',
-                    colour=discord.Colour.green(),
-                    description=description,
-                    )
-                await ctx.interaction.edit_original_response(
-                    embed=embed
-                    )
+                # The catalogue only parses the Playbooks that changed
+                await catalogue.refresh()
             except Exception as e:
                 msg = f'Playbook list generation KO [{e}]'
                 logger.error(msg)
@@ -111,9 +182,64 @@ def playbook(group_ansible):
                 )
                 await ctx.respond(embed=embed)
                 return
-            else:
-                logger.debug(f'[#{channel}][{name}] └──> Queries OK')
+
+            playbooks = list(catalogue.playbooks.values())
+            if len(playbooks) == 0:
+                embed = discord.Embed(
+                    title=f'**Playbooks**: {ANSIBLE_PLAYBOOK_FOLDER}',
+                    description='No Playbooks',
+                    colour=discord.Colour.orange()
+                )
+                await ctx.respond(embed=embed)
                 return
+
+            # One table per page, to stay under the embed size limit
+            embeds = []
+            for page in range(0, len(playbooks), PLAYBOOKS_PER_PAGE):
+                # We start with the headers
+                embed_field_value_table = {
+                    'Playbook': [],
+                    'Hosts': [],
+                    'Tags': [],
+                    }
+                for playbook in playbooks[page:page + PLAYBOOKS_PER_PAGE]:
+                    embed_field_value_table['Playbook'].append(textwrap.shorten(
+                        playbook.path,
+                        width=30,
+                        placeholder="...",
+                        ))
+                    embed_field_value_table['Hosts'].append(textwrap.shorten(
+                        ','.join(playbook.hosts) or '-',
+                        width=15,
+                        placeholder="...",
+                        ))
+                    embed_field_value_table['Tags'].append(textwrap.shorten(
+                        ','.join(playbook.tags) or '-',
+                        width=15,
+                        placeholder="...",
+                        ))
+
+                embeds.append(
+                    discord.Embed(
+                        description=(
+                            '```' +
+                            tabulate(
+                                embed_field_value_table,
+                                headers='keys',
+                                tablefmt='pretty',
+                                stralign='right',
+                                ) +
+                            '```'
+                            ),
+                        colour=discord.Colour.green(),
+                        )
+                    )
+            embeds[0].title = f'**Playbooks**: {ANSIBLE_PLAYBOOK_FOLDER} ({len(playbooks)})'
+
+            # Discord accepts up to 10 embeds (6000 characters) per message
+            for group in group_embeds(embeds):
+                await ctx.respond(embeds=group)
+            logger.debug(f'[#{channel}][{name}] └──> Queries OK')
         elif action == 'show':
             # This command will require basic TECH_RW role, checked before
             playbook_path = f"{ANSIBLE_PLAYBOOK_FOLDER}/{playbook}"
@@ -139,11 +265,12 @@ def playbook(group_ansible):
             playbookfile.close()
             await ctx.respond(embed=embed)
             logger.debug(f'[#{channel}][{name}] └──> Queries OK')
-        elif action == 'check':
+        elif action in ('check', 'run'):
             # This command will require basic TECH_RW role, checked before
-            playbook_path = f"{ANSIBLE_PLAYBOOK_FOLDER}/{playbook}"
-            if not os.path.isfile(playbook_path):
-                msg = f'Playbook does not exists ({playbook_path})'
+            try:
+                playbooks = get_playbooks(playbook)
+            except ValueError as e:
+                msg = str(e)
                 logger.error(msg)
                 embed = discord.Embed(
                     description=msg,
@@ -152,65 +279,40 @@ def playbook(group_ansible):
                 await ctx.respond(embed=embed)
                 return
 
+            commands = []
+            for playbook in playbooks:
+                command = get_command(playbook, limit, tags, forks)
+                title = f'📝 {playbook}'
+                if action == 'check':
+                    command.append("--check")
+                    title += ' (check)'
+                commands.append((title, command))
+
             try:
-                res = subprocess.run(
-                    [
-                        "ansible-playbook",
-                        f"--inventory-file={ANSIBLE_HOSTS_FILE}",
-                        "--user=ansible",
-                        f"{playbook_path}",
-                        "--check",
-                        ],
-                    capture_output=True,
-                    check=True,
-                    env=os.environ,
-                    )
+                # Only the Jobs sharing some hosts with this one wait for each other
+                await catalogue.refresh()
+                hosts = get_job_hosts(playbooks, limit)
             except Exception as e:
-                msg = f'asnsible-playbook command KO [{e}]'
-                logger.error(msg)
-                embed = discord.Embed(
-                    description=msg,
-                    colour=discord.Colour.red()
-                )
-                await ctx.respond(embed=embed)
-                return
-            else:
-                embed = discord.Embed(
-                    description=(
-                        f'```\n'
-                        f"{res.stdout.decode('ascii')}"
-                        f'\n```'
-                        ),
-                    colour=discord.Colour.green()
-                )
-                await ctx.respond(embed=embed)
-                logger.debug(f'[#{channel}][{name}] └──> Queries OK')
-        elif action == 'run':
-            # This command will require basic TECH_RW role, checked before
-            playbook_path = f"{ANSIBLE_PLAYBOOK_FOLDER}/{playbook}"
-            if not os.path.isfile(playbook_path):
-                msg = f'Playbook does not exists ({playbook_path})'
-                logger.error(msg)
-                embed = discord.Embed(
-                    description=msg,
-                    colour=discord.Colour.red()
-                )
-                await ctx.respond(embed=embed)
-                return
+                logger.warning(f'Playbook hosts resolution KO, running alone [{e}]')
+                hosts = None
 
             try:
-                res = subprocess.run(
-                    [
-                        "ansible-playbook",
-                        f"--inventory-file={ANSIBLE_HOSTS_FILE}",
-                        "--user=ansible",
-                        f"{playbook_path}",
-                        ],
-                    capture_output=True,
-                    check=True,
+                # The Playbooks run in the background, we answer with the Job ID
+                job = job_manager.submit(
+                    name=f"playbook {action} {','.join(playbooks)}",
+                    target=limit or 'all',
+                    author=name,
+                    work=lambda job: run_ansible_job(
+                        job,
+                        commands,
+                        ctx.interaction.edit_original_response,
+                        parallel=parallel,
+                        env=env,
+                        ),
+                    hosts=hosts,
                     )
             except Exception as e:
-                msg = f'asnsible-playbook command KO [{e}]'
+                msg = f'ansible-playbook command KO [{e}]'
                 logger.error(msg)
                 embed = discord.Embed(
                     description=msg,
@@ -220,20 +322,21 @@ def playbook(group_ansible):
                 return
             else:
                 embed = discord.Embed(
+                    title=', '.join(title for title, _ in commands)[:256],
                     description=(
-                        f'```\n'
-                        f"{res.stdout.decode('ascii')}"
-                        f'\n```'
+                        f'Job **#{job.id}** queued '
+                        f'(`/{DISCORD_GROUP_GENERAL} jobs jobid:{job.id}`)'
                         ),
-                    colour=discord.Colour.green()
+                    colour=discord.Colour.blue()
                 )
-                await ctx.respond(embed=embed)
-                logger.debug(f'[#{channel}][{name}] └──> Queries OK')
+                await ctx.interaction.edit_original_response(embed=embed)
+                logger.debug(f'[#{channel}][{name}] └──> Job #{job.id} queued')
         elif action == 'hosts':
             # This command will require basic TECH_RW role, checked before
-            playbook_path = f"{ANSIBLE_PLAYBOOK_FOLDER}/{playbook}"
-            if not os.path.isfile(playbook_path):
-                msg = f'Playbook does not exists ({playbook_path})'
+            try:
+                playbooks = get_playbooks(playbook)
+            except ValueError as e:
+                msg = str(e)
                 logger.error(msg)
                 embed = discord.Embed(
                     description=msg,
@@ -242,35 +345,40 @@ def playbook(group_ansible):
                 await ctx.respond(embed=embed)
                 return
 
-            try:
-                res = subprocess.run(
-                    [
-                        "ansible-playbook",
-                        f"--inventory-file={ANSIBLE_HOSTS_FILE}",
-                        "--user=ansible",
-                        f"{playbook_path}",
-                        "--list-hosts",
-                        ],
-                    capture_output=True,
-                    check=True,
+            embeds = []
+            for playbook in playbooks:
+                try:
+                    run = await run_ansible(
+                        get_command(playbook, limit, tags, forks) + ["--list-hosts"],
+                        title=f'📝 {playbook} (hosts)',
+                        env=env,
+                        )
+                except Exception as e:
+                    msg = f'ansible-playbook command KO [{e}]'
+                    logger.error(msg)
+                    embed = discord.Embed(
+                        description=msg,
+                        colour=discord.Colour.red()
+                    )
+                    await ctx.respond(embed=embed)
+                    return
+
+                output = '\n'.join(run.output)[-TAIL_CHARS:]
+                embeds.append(
+                    discord.Embed(
+                        title=run.title[:256],
+                        description=(
+                            f'```\n'
+                            f"{output}"
+                            f'\n```'
+                            ),
+                        colour=(
+                            discord.Colour.green() if run.returncode == 0
+                            else discord.Colour.red()
+                            ),
                     )
-            except Exception as e:
-                msg = f'asnsible-playbook command KO [{e}]'
-                logger.error(msg)
-                embed = discord.Embed(
-                    description=msg,
-                    colour=discord.Colour.red()
-                )
-                await ctx.respond(embed=embed)
-                return
-            else:
-                embed = discord.Embed(
-                    description=(
-                        f'```\n'
-                        f"{res.stdout.decode('ascii')}"
-                        f'\n```'
-                        ),
-                    colour=discord.Colour.green()
                 )
-                await ctx.respond(embed=embed)
-                logger.debug(f'[#{channel}][{name}] └──> Queries OK')
+            # Discord accepts up to 10 embeds (6000 characters) per message
+            for group in group_embeds(embeds):
+                await ctx.respond(embeds=group)
+            logger.debug(f'[#{channel}][{name}] └──> Queries OK')
@@ -1,7 +1,9 @@
 from .billing import billing
+from .jobs import jobs
 from .settings import settings
 
 __all__ = [
     'billing',
+    'jobs',
     'settings',
     ]
\ No newline at end of file
@@ -0,0 +1,94 @@
+# -*- coding: utf8 -*-
+
+"""Module to keep immutable billing records on disk."""
+
+import json
+import os
+import sqlite3
+
+from loguru import logger
+
+# Once a debt reaches one of these, it will not change anymore
+DEBT_FINAL_STATUSES = ('CANCELLED', 'PAID')
+
+
+class BillingCache:
+    """
+    SQLite cache of billing records that never change once issued:
+    - debts in a final status
+    - order detail ids of an order
+    - order details
+    """
+    def __init__(self, path):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.connection = sqlite3.connect(path)
+        except Exception as e:
+            logger.error(f'Billing cache KO, falling back to memory ({path}) [{e}]')
+            self.connection = sqlite3.connect(':memory:')
+        else:
+            logger.debug(f'Billing cache OK ({path})')
+
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS debt ('
+                'debt_id INTEGER PRIMARY KEY, data TEXT NOT NULL)'
+                )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS order_details ('
+                'order_id INTEGER PRIMARY KEY, data TEXT NOT NULL)'
+                )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS order_detail ('
+                'order_id INTEGER, detail_id INTEGER, data TEXT NOT NULL, '
+                'PRIMARY KEY (order_id, detail_id))'
+                )
+
+    def _select(self, query, *args):
+        row = self.connection.execute(query, args).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def get_debt(self, debt_id):
+        """ Returns a cached debt, or None. """
+        return self._select('SELECT data FROM debt WHERE debt_id = ?', debt_id)
+
+    def set_debt(self, debt_id, debt):
+        """ Caches a debt, only if it reached a final status. """
+        if debt['status'] not in DEBT_FINAL_STATUSES:
+            return
+        self.connection.execute(
+            'INSERT OR REPLACE INTO debt VALUES (?, ?)',
+            (debt_id, json.dumps(debt)),
+            )
+
+    def get_order_details(self, order_id):
+        """ Returns the cached detail ids of an order, or None. """
+        return self._select('SELECT data FROM order_details WHERE order_id = ?', order_id)
+
+    def set_order_details(self, order_id, detail_ids):
+        """ Caches the detail ids of an order. """
+        self.connection.execute(
+            'INSERT OR REPLACE INTO order_details VALUES (?, ?)',
+            (order_id, json.dumps(detail_ids)),
+            )
+
+    def get_order_detail(self, order_id, detail_id):
+        """ Returns a cached order detail, or None. """
+        return self._select(
+            'SELECT data FROM order_detail WHERE order_id = ? AND detail_id = ?',
+            order_id,
+            detail_id,
+            )
+
+    def set_order_detail(self, order_id, detail_id, detail):
+        """ Caches an order detail. """
+        self.connection.execute(
+            'INSERT OR REPLACE INTO order_detail VALUES (?, ?, ?)',
+            (order_id, detail_id, json.dumps(detail)),
+            )
+
+    def commit(self):
+        """ Flushes pending writes to disk. """
+        self.connection.commit()
@@ -13,15 +13,50 @@ from loguru import logger
 from tabulate import tabulate
 
 from variables import (
+    BILLING_CACHE_FILE,
     DISCORD_GROUP_GENERAL,
     ROLE_ACCOUNTING,
 )
 
+from utils.concurrency import gather_bounded
+from utils.embeds import (
+    group_embeds,
+    split_embed,
+)
+
+from ._cache import BillingCache
+
 
 def billing(group_global, ovh_client, my_nic):
     """
     Discord command definition for /{DISCORD_GROUP_GENERAL} billing
     """
+    billing_cache = BillingCache(BILLING_CACHE_FILE)
+
+    async def get_debt(debt_id):
+        """ Fetches a debt, from the cache when possible. """
+        debt = billing_cache.get_debt(debt_id)
+        if debt is None:
+            debt = await ovh_client.get(f'/me/debtAccount/debt/{debt_id}')
+            billing_cache.set_debt(debt_id, debt)
+        return debt
+
+    async def get_order_details(order_id):
+        """ Fetches the detail ids of an order, from the cache when possible. """
+        detail_ids = billing_cache.get_order_details(order_id)
+        if detail_ids is None:
+            detail_ids = await ovh_client.get(f'/me/order/{order_id}/details')
+            billing_cache.set_order_details(order_id, detail_ids)
+        return detail_ids
+
+    async def get_order_detail(order_id, detail_id):
+        """ Fetches an order detail, from the cache when possible. """
+        detail = billing_cache.get_order_detail(order_id, detail_id)
+        if detail is None:
+            detail = await ovh_client.get(f'/me/order/{order_id}/details/{detail_id}')
+            billing_cache.set_order_detail(order_id, detail_id, detail)
+        return detail
+
     @group_global.command(
     description='Commands related to Project Billing',
     default_permission=False,
@@ -72,7 +107,7 @@ def billing(group_global, ovh_client, my_nic):
                 colour=discord.Colour.green()
                 )
 
-            debts_id = ovh_client.get('/me/debtAccount/debt')
+            debts_id = await ovh_client.get('/me/debtAccount/debt')
             if len(debts_id) == 0:
                 # There is no Debt at all on the NIC
                 embed.add_field(
@@ -81,44 +116,60 @@ def billing(group_global, ovh_client, my_nic):
                     inline=False,
                     )
 
-            debt_counter = 0  # Used to track if we skipped all content or not
-
-            for debt_id in debts_id:
-                # We start with the headers
-                embed_field_value_table = {
-                    'Type': [],
-                    'Description': [],
-                    'Price': [],
-                    }
-
-                # We locate the debt to have the initial orderId
-                debt = ovh_client.get(
-                    f'/me/debtAccount/debt/{debt_id}'
-                    )
+            # We locate the debts to have the initial orderIds
+            # Records already in the cache do not trigger any API call
+            debts = await gather_bounded(
+                get_debt(debt_id) for debt_id in debts_id
+                )
 
-                # Depending on the Discord request, we may dismiss some results
+            # Depending on the Discord request, we may dismiss some results
+            # It is done before fetching the orders to spare useless API calls
+            now_dt = datetime.datetime.now(pytz.utc)
+            selected_debts = []
+            for debt_id, debt in zip(debts_id, debts):
                 if debt_status == 'unpaid' and debt['status'] != 'UNPAID':
                     continue
-                else:
-                    order_id = debt['orderId']
 
                 # Limiting output based on debt_period Selector
                 order_dt = datetime.datetime.fromisoformat(debt['date'])
-                now_dt = datetime.datetime.now(pytz.utc)
                 days_since = int((now_dt - order_dt).total_seconds() / 86400.0)
                 if days_since > int(debt_period):
                     continue
 
-                # With the orderId, we grab the orderDetailIds
-                detailed_orders_id = ovh_client.get(
-                    f'/me/order/{order_id}/details'
-                    )
+                selected_debts.append((debt_id, debt, order_dt))
+
+            # With the orderIds, we grab the orderDetailIds
+            detailed_orders_ids = await gather_bounded(
+                get_order_details(debt['orderId']) for _, debt, _ in selected_debts
+                )
+
+            # We grab all the detailed orders in one batch
+            detailed_orders = await gather_bounded(
+                get_order_detail(debt['orderId'], detailed_order_id)
+                for (_, debt, _), detailed_orders_id in zip(selected_debts, detailed_orders_ids)
+                for detailed_order_id in detailed_orders_id
+                )
+            detailed_orders = iter(detailed_orders)
+            billing_cache.commit()
+
+            debt_counter = 0  # Used to track if we skipped all content or not
+
+            for (debt_id, debt, order_dt), detailed_orders_id in zip(
+                selected_debts,
+                detailed_orders_ids,
+                ):
+                order_id = debt['orderId']
+                project_id = None
+                # We start with the headers
+                embed_field_value_table = {
+                    'Type': [],
+                    'Description': [],
+                    'Price': [],
+                    }
 
                 # We loop over the detailed orders to grab the infos
-                for detailed_order_id in detailed_orders_id:
-                    detailed_order = ovh_client.get(
-                    f'/me/order/{order_id}/details/{detailed_order_id}'
-                    )
+                for _ in detailed_orders_id:
+                    detailed_order = next(detailed_orders)
                     project_id = detailed_order['domain']
                     desc = textwrap.shorten(
                         detailed_order['description'],
@@ -150,7 +201,6 @@ def billing(group_global, ovh_client, my_nic):
                     inline=False,
                     )
                 debt_counter += 1
-                await ctx.interaction.edit_original_response(embed=embed)
 
             # There was debts, but not showned due to limiting
             if debt_counter == 0:
@@ -159,7 +209,12 @@ def billing(group_global, ovh_client, my_nic):
                     value='No Debt/Current billing matching status & date criteria',
                     inline=False,
                     )
-                await ctx.interaction.edit_original_response(embed=embed)
+
+            # Discord accepts up to 25 fields per embed, 10 embeds (6000 characters) per message
+            groups = group_embeds(split_embed(embed))
+            await ctx.interaction.edit_original_response(embeds=groups[0])
+            for group in groups[1:]:
+                await ctx.respond(embeds=group)
 
         except Exception as e:
             msg = f'API calls KO [{e}]'
@@ -0,0 +1,129 @@
+"""
+Discord command definition for /{DISCORD_GROUP_GENERAL} jobs
+"""
+import datetime
+
+import discord
+
+from discord.commands import option
+from discord.ext import commands
+from loguru import logger
+from tabulate import tabulate
+
+from variables import (
+    DISCORD_GROUP_GENERAL,
+    ROLE_TECH_RO,
+)
+
+from utils.jobs import job_manager
+
+JOB_STATUS_EMOJI = {
+    'queued': '⏳',
+    'running': '⚙️',
+    'done': '✅',
+    'failed': '❌',
+    }
+
+
+def jobs(group_global):
+    """
+    Discord command definition for /{DISCORD_GROUP_GENERAL} jobs
+    """
+    @group_global.command(
+        description='Commands related to background Jobs',
+        default_permission=False,
+        name='jobs',
+        )
+    @commands.has_any_role(ROLE_TECH_RO)
+    @option(
+        "jobid",
+        description="Job ID",
+        required=False,
+        )
+    async def jobs(
+        ctx,
+        jobid: int,
+    ):
+        """
+        This part displays background Jobs
+        So far:
+        - without jobid: Displays the list of recent Jobs
+        - with jobid: Displays the status and output of a specific Job
+        """
+        # Pre-flight checks
+        if ctx.channel.type is discord.ChannelType.private:
+            channel = ctx.channel.type
+        else:
+            channel = ctx.channel.name
+        name = ctx.author.name
+        logger.info(f'[#{channel}][{name}] /{DISCORD_GROUP_GENERAL} jobs {jobid}')
+
+        if jobid is None:
+            recent_jobs = job_manager.recent()
+            if len(recent_jobs) == 0:
+                embed = discord.Embed(
+                    description='No Jobs',
+                    colour=discord.Colour.green()
+                )
+                await ctx.respond(embed=embed)
+                return
+
+            # We start with the headers
+            embed_field_value_table = {
+                'ID': [],
+                'Job': [],
+                'Status': [],
+                'Duration': [],
+                }
+            for job in recent_jobs[:20]:
+                embed_field_value_table['ID'].append(job.id)
+                embed_field_value_table['Job'].append(job.name[:30])
+                embed_field_value_table['Status'].append(job.status)
+                embed_field_value_table['Duration'].append(f'{job.duration:.0f}s')
+
+            embed = discord.Embed(
+                title='**Jobs**',
+                description=(
+                    '```' +
+                    tabulate(
+                        embed_field_value_table,
+                        headers='keys',
+                        tablefmt='pretty',
+                        stralign='right',
+                        ) +
+                    '```'
+                    ),
+                colour=discord.Colour.green()
+                )
+            await ctx.respond(embed=embed)
+            logger.debug(f'[#{channel}][{name}] └──> Queries OK')
+            return
+
+        job = job_manager.get(jobid)
+        if job is None:
+            msg = f'Job not found (#{jobid})'
+            logger.error(msg)
+            embed = discord.Embed(
+                description=msg,
+                colour=discord.Colour.red()
+            )
+            await ctx.respond(embed=embed)
+            return
+
+        created = datetime.datetime.fromtimestamp(job.created_at)
+        embed = discord.Embed(
+            # Embed titles are limited to 256 characters
+            title=f'{JOB_STATUS_EMOJI[job.status]} Job #{job.id}: {job.name}'[:256],
+            description=f'```\n{job.output[-3500:]}\n```' if job.output else None,
+            colour=discord.Colour.red() if job.status == 'failed' else discord.Colour.green()
+            )
+        embed.add_field(name='Status', value=job.status, inline=True)
+        embed.add_field(name='Duration', value=f'{job.duration:.1f}s', inline=True)
+        embed.add_field(name='Target', value=f'`{job.target[:1000]}`', inline=True)
+        if job.error:
+            embed.add_field(name='Error', value=job.error[:1024], inline=False)
+        embed.set_footer(
+            text=f'Queued by {job.author} @{created.strftime("%Y-%m-%d %H:%M:%S")}'
+            )
+        await ctx.respond(embed=embed)
+        logger.debug(f'[#{channel}][{name}] └──> Queries OK')
@@ -4,9 +4,9 @@ Discord command definition for /{DISCORD_GROUP_GENERAL} settings
 import os
 
 import discord
-import ovh
 
 from loguru import logger
+from tabulate import tabulate
 
 from variables import (
     DISCORD_GROUP_GENERAL,
@@ -17,6 +17,9 @@ from variables import (
     ROLE_ACCOUNTING,
 )
 
+from utils.cache import api_cache
+from utils.gateway import get_gateway
+
 
 def settings(group_global):
     """
@@ -78,13 +81,8 @@ def settings(group_global):
 
         try:
             # Lets check OVHcloud API connection status
-            ovh_client = ovh.Client(
-                endpoint=OVH_ENDPOINT,
-                application_key=OVH_AK,
-                application_secret=OVH_AS,
-                consumer_key=OVH_CK,
-                )
-            me = ovh_client.get('/me')
+            ovh_client = get_gateway()
+            me = await ovh_client.get('/me')
             # At least one of the credentials info is missing
             if me is None or me['nichandle'] is None:
                 value_auth=(
@@ -109,6 +107,38 @@ def settings(group_global):
             inline=False,
             )
 
+        # Lets display the in-memory cache counters (to tune CACHE_TTL_*)
+        cache_stats = api_cache.stats()
+        if len(cache_stats) == 0:
+            value_cache = 'Nothing cached yet'
+        else:
+            embed_field_value_table = {
+                'Endpoint': [],
+                'Hit': [],
+                'Stale': [],
+                'Miss': [],
+                }
+            for endpoint, counter in sorted(cache_stats.items()):
+                embed_field_value_table['Endpoint'].append(endpoint)
+                embed_field_value_table['Hit'].append(counter['hit'])
+                embed_field_value_table['Stale'].append(counter['stale'])
+                embed_field_value_table['Miss'].append(counter['miss'])
+            value_cache = (
+                '```' +
+                tabulate(
+                    embed_field_value_table,
+                    headers='keys',
+                    tablefmt='pretty',
+                    stralign='right',
+                    ) +
+                '```'
+                )
+        embed.add_field(
+            name='Cache',
+            value=value_cache,
+            inline=False,
+            )
+
         try:
             # We answer
             await ctx.interaction.edit_original_response(
@@ -3,17 +3,72 @@
 """Module to locate all Autocomplete lists."""
 
 import discord
-import ovh
 
 from loguru import logger
 
 from variables import (
-    OVH_AK,
-    OVH_AS,
-    OVH_CK,
-    OVH_ENDPOINT,
+    CACHE_TTL,
 )
 
+from utils.cache import api_cache
+from utils.concurrency import gather_bounded
+from utils.gateway import get_gateway
+from utils.matcher import ChoiceIndex
+
+from ._inventory import get_filer_inventory
+
+#
+# Private Cloud related Autocomplete indexes
+#
+
+async def fetch_hpc_index():
+    """ Function to fetch and index the HPC. """
+    service_names = await get_gateway().get('/dedicatedCloud')
+
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(f"🏢 {service_name}", value=service_name),
+            (service_name,),
+            )
+        for service_name in service_names or []
+        )
+
+async def fetch_hpc_user_index(service_name):
+    """ Function to fetch and index the Users of a HPC. """
+    ovh_client = get_gateway()
+    users_id = await ovh_client.get(f'/dedicatedCloud/{service_name}/user')
+    users = await gather_bounded(
+        ovh_client.get(f'/dedicatedCloud/{service_name}/user/{user_id}')
+        for user_id in users_id or []
+        )
+
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(
+                f"👤 {user['login']}",
+                value=f"{user['userId']}",
+                ),
+            (user['login'], user['userId']),
+            )
+        for user in users
+        )
+
+async def fetch_hpc_filer_index(service_name):
+    """ Function to index the Filers of a HPC. """
+    filer_inventory = await get_filer_inventory(service_name)
+
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(
+                f"🗄️ {filer['name']}",
+                value=f"{datacenter_id}/{filer['filerId']}",
+                ),
+            (filer['name'], filer['filerId']),
+            )
+        for datacenter_id, filers in filer_inventory
+        for filer in filers
+        )
+
 #
 # Private Cloud related Autocomplete lists
 #
@@ -21,100 +76,43 @@ from variables import (
 async def get_hpc_list(ctx: discord.AutocompleteContext):
     """ Function to build and serve an Autocomplete list of HPC. """
     try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
-            )
-
-        service_names = ovh_client.get(
-            '/dedicatedCloud'
+        hpc_index = await api_cache.get(
+            ('/dedicatedCloud',),
+            fetch_hpc_index,
+            CACHE_TTL['hpc'],
             )
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
     else:
-        if service_names is None or len(service_names) == 0:
-            return []
-
-        hpc_list = []
-        for service_name in service_names:
-            hpc_list.append(
-                discord.OptionChoice(f"🏢 {service_name}", value=service_name)
-                )
-
-        return hpc_list
+        return hpc_index.search(ctx.value)
 
 async def get_hpc_user_list(ctx: discord.AutocompleteContext):
-    """ Function to build and serve an Autocomplete list of Vouchers. """
+    """ Function to build and serve an Autocomplete list of Users. """
+    service_name = ctx.options["service_name"]
     try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
-            )
-        users_id = ovh_client.get(
-            f'/dedicatedCloud/{ctx.options["service_name"]}'
-            f'/user'
+        user_index = await api_cache.get(
+            ('/dedicatedCloud/{}/user', service_name),
+            lambda: fetch_hpc_user_index(service_name),
+            CACHE_TTL['hpc_user'],
             )
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
     else:
-        if users_id is None or len(users_id) == 0:
-            return []
-
-        user_list = []
-        for user_id in users_id:
-            user = ovh_client.get(
-                f'/dedicatedCloud/{ctx.options["service_name"]}'
-                f'/user/{user_id}'
-                )
-            user_list.append(
-                discord.OptionChoice(
-                    f"👤 {user['login']}",
-                    value=f"{user['userId']}",
-                    )
-                )
-        return user_list
+        return user_index.search(ctx.value)
 
 async def get_hpc_filer_list(ctx: discord.AutocompleteContext):
     """ Function to build and serve an Autocomplete list of Filers. """
+    service_name = ctx.options["service_name"]
     try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
-            )
-        datacenters_id = ovh_client.get(
-            f'/dedicatedCloud/{ctx.options["service_name"]}'
-            f'/datacenter'
+        filer_index = await api_cache.get(
+            ('/dedicatedCloud/{}/filer', service_name),
+            lambda: fetch_hpc_filer_index(service_name),
+            CACHE_TTL['hpc_filer'],
             )
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
     else:
-        if datacenters_id is None or len(datacenters_id) == 0:
-            return []
-
-        filer_list = []
-        for datacenter_id in datacenters_id:
-            filers_id = ovh_client.get(
-                f'/dedicatedCloud/{ctx.options["service_name"]}'
-                f'/datacenter/{datacenter_id}/filer'
-                )
-            for filer_id in filers_id:
-                filer = ovh_client.get(
-                    f'/dedicatedCloud/{ctx.options["service_name"]}'
-                    f'/datacenter/{datacenter_id}/filer/{filer_id}'
-                    )
-                filer_list.append(
-                    discord.OptionChoice(
-                        f"🗄️ {filer['name']}",
-                        value=f"{datacenter_id}/{filer['filerId']}",
-                        )
-                    )
-        return filer_list
+        return filer_index.search(ctx.value)
@@ -0,0 +1,47 @@
+# -*- coding: utf8 -*-
+
+"""Module to fetch Hosted Private Cloud inventories."""
+
+from variables import (
+    CACHE_TTL,
+)
+
+from utils.cache import api_cache
+from utils.concurrency import gather_bounded
+from utils.gateway import get_gateway
+
+
+async def fetch_filers(service_name):
+    """
+    Function to fetch the Filers of every Datacenter of a HPC concurrently.
+    Returns a list of (datacenter_id, [filer, ...]) in the API order.
+    """
+    ovh_client = get_gateway()
+
+    async def fetch_datacenter_filers(datacenter_id):
+        """ Fetches the details of all the Filers of a Datacenter. """
+        filers_id = await ovh_client.get(
+            f'/dedicatedCloud/{service_name}/datacenter/{datacenter_id}/filer'
+            )
+        return await gather_bounded(
+            ovh_client.get(
+                f'/dedicatedCloud/{service_name}'
+                f'/datacenter/{datacenter_id}/filer/{filer_id}'
+                )
+            for filer_id in filers_id
+            )
+
+    datacenters_id = await ovh_client.get(f'/dedicatedCloud/{service_name}/datacenter')
+    filers = await gather_bounded(
+        fetch_datacenter_filers(datacenter_id) for datacenter_id in datacenters_id
+        )
+    return list(zip(datacenters_id, filers))
+
+
+async def get_filer_inventory(service_name):
+    """ Function to serve the Filers of a HPC, from a short-lived cache. """
+    return await api_cache.get(
+        ('/dedicatedCloud/{}/datacenter/{}/filer', service_name),
+        lambda: fetch_filers(service_name),
+        CACHE_TTL['hpc_filer'],
+        )
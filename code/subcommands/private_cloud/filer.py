@@ -21,6 +21,7 @@ from ._autocomplete import (
     get_hpc_list,
     get_hpc_filer_list,
 )
+from ._inventory import get_filer_inventory
 
 
 def filer(group_hpc, ovh_client, my_nic):
@@ -78,7 +79,7 @@ def filer(group_hpc, ovh_client, my_nic):
 
         # Whatever is the action, we check the service is still active first
         try:
-            hpc = ovh_client.get(f'/dedicatedCloud/{service_name}')
+            hpc = await ovh_client.get(f'/dedicatedCloud/{service_name}')
         except Exception as e:
             msg = f'API calls KO [{e}]'
             logger.error(msg)
@@ -107,7 +108,8 @@ def filer(group_hpc, ovh_client, my_nic):
                     )
 
             try:
-                datacenters = ovh_client.get(f'/dedicatedCloud/{service_name}/datacenter')
+                # The inventory is shared with the Autocomplete (short-lived cache)
+                filer_inventory = await get_filer_inventory(service_name)
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -118,15 +120,6 @@ def filer(group_hpc, ovh_client, my_nic):
                 await ctx.respond(embed=embed)
                 return
 
-            # We start with the headers
-            embed_field_value_table = {
-                'Name': [],
-                'Prov.': [],
-                'Used': [],
-                'Free': [],
-                'Total': [],
-            }
-
             # We loop over the datacenters
             try:
                 embed = discord.Embed(
@@ -134,17 +127,17 @@ def filer(group_hpc, ovh_client, my_nic):
                     colour=discord.Colour.green()
                     )
 
-                for datacenter_id in datacenters:
-                    filers = ovh_client.get(
-                        f'/dedicatedCloud/{service_name}/datacenter/{datacenter_id}/filer'
-                        )
-
-                    for filer_id in filers:
-                        filer = ovh_client.get(
-                            f'/dedicatedCloud/{service_name}'
-                            f'/datacenter/{datacenter_id}/filer/{filer_id}'
-                            )
-
+                for datacenter_id, filers in filer_inventory:
+                    # We start with the headers
+                    embed_field_value_table = {
+                        'Name': [],
+                        'Prov.': [],
+                        'Used': [],
+                        'Free': [],
+                        'Total': [],
+                    }
+
+                    for filer in filers:
                         embed_field_value_table['Name'].append(
                                 filer['name']
                                 )
@@ -176,7 +169,7 @@ def filer(group_hpc, ovh_client, my_nic):
                         inline=False,
                         )
 
-                    await ctx.interaction.edit_original_response(embed=embed)
+                await ctx.interaction.edit_original_response(embed=embed)
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -219,7 +212,7 @@ def filer(group_hpc, ovh_client, my_nic):
                     )
                     await ctx.respond(embed=embed)
                     return
-                filer = ovh_client.get(
+                filer = await ovh_client.get(
                     f'/dedicatedCloud/{service_name}'
                     f"/datacenter/{m.group('datacenter_id')}"
                     f"/filer/{m.group('filer_name')}"
@@ -71,7 +71,7 @@ def infrastructure(group_hpc, ovh_client, my_nic):
         if action == 'list':
             # This command will require basic TECH_RO role, checked before
             try:
-                service_names = ovh_client.get('/dedicatedCloud')
+                service_names = await ovh_client.get('/dedicatedCloud')
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -90,7 +90,7 @@ def infrastructure(group_hpc, ovh_client, my_nic):
                     )
 
                 for service_name in service_names:
-                    hpc = ovh_client.get(f'/dedicatedCloud/{service_name}')
+                    hpc = await ovh_client.get(f'/dedicatedCloud/{service_name}')
                     embed.add_field(
                         name=f'Hosted Private Cloud: **{service_name}**',
                         value=(
@@ -133,7 +133,7 @@ def infrastructure(group_hpc, ovh_client, my_nic):
                 return
 
             try:
-                hpc = ovh_client.get(f'/dedicatedCloud/{service_name}')
+                hpc = await ovh_client.get(f'/dedicatedCloud/{service_name}')
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
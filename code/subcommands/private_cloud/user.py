@@ -75,7 +75,7 @@ def user(group_hpc, ovh_client, my_nic):
 
         # Whatever is the action, we check the service is still active first
         try:
-            hpc = ovh_client.get(f'/dedicatedCloud/{service_name}')
+            hpc = await ovh_client.get(f'/dedicatedCloud/{service_name}')
         except Exception as e:
             msg = f'API calls KO [{e}]'
             logger.error(msg)
@@ -104,7 +104,7 @@ def user(group_hpc, ovh_client, my_nic):
                     )
 
             try:
-                users = ovh_client.get(f'/dedicatedCloud/{service_name}/user')
+                users = await ovh_client.get(f'/dedicatedCloud/{service_name}/user')
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -118,7 +118,7 @@ def user(group_hpc, ovh_client, my_nic):
             # We loop over the users
             try:
                 for user_id in users:
-                    user = ovh_client.get(f'/dedicatedCloud/{service_name}/user/{user_id}')
+                    user = await ovh_client.get(f'/dedicatedCloud/{service_name}/user/{user_id}')
 
                     embed.add_field(
                         name=f"👤 {user['login']}",
@@ -166,7 +166,7 @@ def user(group_hpc, ovh_client, my_nic):
                 return
 
             try:
-                user = ovh_client.get(f'/dedicatedCloud/{service_name}/user/{user_name}')
+                user = await ovh_client.get(f'/dedicatedCloud/{service_name}/user/{user_name}')
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
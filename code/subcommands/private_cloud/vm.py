@@ -1,6 +1,7 @@
 """
 Discord command definition for /{DISCORD_GROUP_PCC} vm
 """
+import asyncio
 import textwrap
 
 import discord
@@ -15,6 +16,8 @@ from variables import (
     ROLE_TECH_RO,
 )
 
+from utils.concurrency import gather_bounded
+
 from ._autocomplete import (
     get_hpc_list,
 )
@@ -67,7 +70,7 @@ def vm(group_hpc, ovh_client, my_nic):
 
         # Whatever is the action, we check the service is still active first
         try:
-            hpc = ovh_client.get(f'/dedicatedCloud/{service_name}')
+            hpc = await ovh_client.get(f'/dedicatedCloud/{service_name}')
         except Exception as e:
             msg = f'API calls KO [{e}]'
             logger.error(msg)
@@ -96,7 +99,7 @@ def vm(group_hpc, ovh_client, my_nic):
                     )
 
             try:
-                datacenters = ovh_client.get(f'/dedicatedCloud/{service_name}/datacenter')
+                datacenters = await ovh_client.get(f'/dedicatedCloud/{service_name}/datacenter')
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -107,60 +110,68 @@ def vm(group_hpc, ovh_client, my_nic):
                 await ctx.respond(embed=embed)
                 return
 
+            async def fetch_datacenter_vms(datacenter_id):
+                """ Fetches the details of all the VMs of a Datacenter. """
+                vms_id = await ovh_client.get(
+                    f'/dedicatedCloud/{service_name}'
+                    f'/datacenter/{datacenter_id}/vm'
+                    )
+                return await gather_bounded(
+                    ovh_client.get(
+                        f'/dedicatedCloud/{service_name}'
+                        f'/datacenter/{datacenter_id}/vm/{vm_id}'
+                        )
+                    for vm_id in vms_id
+                    )
+
             # We loop over the datacenters
-            hosts = {}
+            # They are queried at once, and displayed as soon as one is complete
             try:
                 embed = discord.Embed(
                     title=f'**{my_nic}**',
                     colour=discord.Colour.green()
                     )
 
-                for datacenter_id in datacenters:
-                    vms = ovh_client.get(
-                        f'/dedicatedCloud/{service_name}'
-                        f'/datacenter/{datacenter_id}/vm'
-                        )
-
-                    for vm_id in vms:
-                        vm = ovh_client.get(
-                            f'/dedicatedCloud/{service_name}'
-                            f'/datacenter/{datacenter_id}/vm/{vm_id}'
-                            )
+                for datacenter_vms in asyncio.as_completed(
+                    [fetch_datacenter_vms(datacenter_id) for datacenter_id in datacenters]
+                    ):
+                    hosts = {}
+                    for vm in await datacenter_vms:
                         host = f"{vm['clusterName']}/{vm['hostName']}"
                         if host not in hosts:
                             hosts[host] = []
                         hosts[host].append(vm)
 
-                # We loop on hosts to have a better display
-                for host, vms in hosts.items():
-                    # We start with the headers
-                    embed_field_value_table = {
-                        'Name': [],
-                        'vCPUs': [],
-                        'RAM': [],
-                        'State': [],
-                    }
-                    for vm in vms:
-                        vm_name = textwrap.shorten(vm['name'], width=27, placeholder="...")
-                        embed_field_value_table['Name'].append(vm_name)
-                        embed_field_value_table['vCPUs'].append(vm['cpuNum'])
-                        embed_field_value_table['RAM'].append(vm['memoryMax'])
-                        embed_field_value_table['State'].append(vm['powerState'])
-
-                    embed.add_field(
-                        name=f'Host: **{host}**',
-                        value=(
-                            '```' +
-                            tabulate(
-                                embed_field_value_table,
-                                headers='keys',
-                                tablefmt='pretty',
-                                stralign='right',
-                                ) +
-                            '```'
-                            ),
-                        inline=False,
-                        )
+                    # We loop on hosts to have a better display
+                    for host, vms in hosts.items():
+                        # We start with the headers
+                        embed_field_value_table = {
+                            'Name': [],
+                            'vCPUs': [],
+                            'RAM': [],
+                            'State': [],
+                        }
+                        for vm in vms:
+                            vm_name = textwrap.shorten(vm['name'], width=27, placeholder="...")
+                            embed_field_value_table['Name'].append(vm_name)
+                            embed_field_value_table['vCPUs'].append(vm['cpuNum'])
+                            embed_field_value_table['RAM'].append(vm['memoryMax'])
+                            embed_field_value_table['State'].append(vm['powerState'])
+
+                        embed.add_field(
+                            name=f'Host: **{host}**',
+                            value=(
+                                '```' +
+                                tabulate(
+                                    embed_field_value_table,
+                                    headers='keys',
+                                    tablefmt='pretty',
+                                    stralign='right',
+                                    ) +
+                                '```'
+                                ),
+                            inline=False,
+                            )
 
                     await ctx.interaction.edit_original_response(embed=embed)
             except Exception as e:
@@ -3,180 +3,297 @@
 """Module to locate all Autocomplete lists."""
 
 import discord
-import ovh
 
 from loguru import logger
 
 from variables import (
-    OVH_AK,
-    OVH_AS,
-    OVH_CK,
-    OVH_ENDPOINT,
+    CACHE_TTL,
 )
 
+from utils.cache import api_cache
+from utils.concurrency import gather_bounded
+from utils.gateway import get_gateway
+from utils.matcher import (
+    AUTOCOMPLETE_LIMIT,
+    ChoiceIndex,
+)
+
+from ._catalogue import catalogue_cache
+from ._index import get_instance_index
+
 
 #
-# Public Cloud related Autocomplete lists
+# Public Cloud related Autocomplete indexes
 #
 
-async def get_instance_list(ctx: discord.AutocompleteContext):
-    """ Function to build and serve an Autocomplete list of Project Instances. """
+async def fetch_instance_index(projectid):
+    """ Function to fetch and index the Instances of a Project. """
+    instances = await get_gateway().get(f'/cloud/project/{projectid}/instance')
+
     instance_list = []
+    for instance in instances or []:
+        if 'nodepool' in instance['name']:
+            # We want to exclude K8s nodepool nodes
+            # Too much trouble if someone mistakenly kills one
+            continue
 
-    if ctx.options["projectid"] is None:
-        return instance_list
+        instance_list.append(
+            (
+                discord.OptionChoice(
+                    f"⚙️ {instance['name']} ({instance['id']})",
+                    value=instance['id'],
+                    ),
+                (instance['name'], instance['id']),
+                )
+            )
+    return ChoiceIndex(instance_list)
 
-    try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
+
+async def fetch_sshkey_index(projectid):
+    """ Function to fetch and index the SSH Keys of a Project. """
+    sshkeys = await get_gateway().get(f'/cloud/project/{projectid}/sshkey')
+
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(f"🔐 {sshkey['name']}", value=f"{sshkey['id']}"),
+            (sshkey['name'], sshkey['id']),
             )
+        for sshkey in sshkeys or []
+        )
+
 
-        instances = ovh_client.get(
-            f'/cloud/project/{ctx.options["projectid"]}/instance'
+async def fetch_project_index():
+    """ Function to fetch and index the Projects. """
+    projects_id = await get_gateway().get('/cloud/project')
+
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(f"📂 {project_id}", value=project_id),
+            (project_id,),
             )
-    except Exception as e:
-        logger.error(f'Autocomplete generation KO [{e}]')
-        return []
-    else:
-        if instances is None or len(instances) == 0:
+        for project_id in projects_id or []
+        )
+
+
+async def fetch_user_index(projectid):
+    """ Function to fetch and index the Users of a Project. """
+    users = await get_gateway().get(f'/cloud/project/{projectid}/user')
+
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(
+                f"👤 {user['description']} ({user['username']})",
+                value=f"{user['id']}",
+                ),
+            (user['description'], user['username'], user['id']),
+            )
+        for user in users or []
+        )
+
+
+async def fetch_voucher_index(projectid):
+    """ Function to fetch and index the Vouchers (credits) of a Project. """
+    ovh_client = get_gateway()
+    credits_id = await ovh_client.get(f'/cloud/project/{projectid}/credit')
+    credits_list = await gather_bounded(
+        ovh_client.get(f'/cloud/project/{projectid}/credit/{credit_id}')
+        for credit_id in credits_id or []
+        )
+
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(
+                f"💳 {credit['id']} ({credit['voucher']})",
+                value=f"{credit['id']}",
+                ),
+            (credit['voucher'], credit['id']),
+            )
+        for credit in credits_list
+        )
+
+
+#
+# Public Cloud related Autocomplete lists
+#
+
+async def get_instance_list(ctx: discord.AutocompleteContext):
+    """
+    Function to build and serve an Autocomplete list of Project Instances.
+    Without a Project, the Instances of every Project are searched.
+    """
+    if ctx.options["projectid"] is None:
+        try:
+            instance_index = await get_instance_index()
+        except Exception as e:
+            logger.error(f'Autocomplete generation KO [{e}]')
             return []
         else:
-            for instance in instances:
-                if 'nodepool' in instance['name']:
-                    # We want to exclude K8s nodepool nodes
-                    # Too much trouble if someone mistakenly kills one
-                    continue
-
-                instance_list.append(
+            return [
                 discord.OptionChoice(
-                    f"⚙️ {instance['name']} ({instance['id']})",
+                    (
+                        f"⚙️ {instance['name']} "
+                        f"({instance['region']}, {instance['projectId'][:8]})"
+                        )[:100],
                     value=instance['id'],
                     )
-                )
-            return instance_list
+                for instance in instance_index.search(ctx.value, limit=AUTOCOMPLETE_LIMIT)
+                ]
+
+    projectid = ctx.options["projectid"]
+    try:
+        instance_index = await api_cache.get(
+            ('/cloud/project/{}/instance', projectid),
+            lambda: fetch_instance_index(projectid),
+            CACHE_TTL['instance'],
+            )
+    except Exception as e:
+        logger.error(f'Autocomplete generation KO [{e}]')
+        return []
+    else:
+        return instance_index.search(ctx.value)
 
 
 async def get_sshkey_list(ctx: discord.AutocompleteContext):
     """ Function to build and serve an Autocomplete list of SSH Keys. """
-    sshkey_list = []
-
     if ctx.options["projectid"] is None:
-        return sshkey_list
+        return []
 
+    projectid = ctx.options["projectid"]
     try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
-            )
-
-        sshkeys = ovh_client.get(
-            f'/cloud/project/{ctx.options["projectid"]}/sshkey'
+        sshkey_index = await api_cache.get(
+            ('/cloud/project/{}/sshkey', projectid),
+            lambda: fetch_sshkey_index(projectid),
+            CACHE_TTL['sshkey'],
             )
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
     else:
-        if sshkeys is None or len(sshkeys) == 0:
-            return sshkey_list
-        else:
-            for sshkey in sshkeys:
-                sshkey_list.append(
-                    discord.OptionChoice(f"🔐 {sshkey['name']}", value=f"{sshkey['id']}")
-                    )
-            return sshkey_list
+        return sshkey_index.search(ctx.value)
 
 
 async def get_project_list(ctx: discord.AutocompleteContext):
     """ Function to build and serve an Autocomplete list of Projects. """
     try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
+        project_index = await api_cache.get(
+            ('/cloud/project',),
+            fetch_project_index,
+            CACHE_TTL['project'],
             )
+    except Exception as e:
+        logger.error(f'Autocomplete generation KO [{e}]')
+        return []
+    else:
+        return project_index.search(ctx.value)
+
+async def get_region_list(ctx: discord.AutocompleteContext):
+    """ Function to build and serve an Autocomplete list of the catalogue regions. """
+    if ctx.options["projectid"] is None:
+        return []
 
-        projects_id = ovh_client.get('/cloud/project')
+    try:
+        # Served from the disk/memory, refreshed in the background when stale
+        catalogue = await catalogue_cache.get(ctx.options["projectid"])
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
     else:
-        if projects_id is None or len(projects_id) == 0:
-            return []
+        return [
+            discord.OptionChoice(f"🌍 {region}", value=region)
+            for region in catalogue.search_regions(ctx.value)[:AUTOCOMPLETE_LIMIT]
+            ]
 
-        project_list = []
-        for project_id in projects_id:
-            project_list.append(
-                discord.OptionChoice(f"📂 {project_id}", value=project_id)
-                )
+async def get_image_list(ctx: discord.AutocompleteContext):
+    """
+    Function to build and serve an Autocomplete list of the catalogue images.
+    Limited to the regions matching the region option, when one is given.
+    """
+    if ctx.options["projectid"] is None:
+        return []
+
+    try:
+        catalogue = await catalogue_cache.get(ctx.options["projectid"])
+    except Exception as e:
+        logger.error(f'Autocomplete generation KO [{e}]')
+        return []
 
-        return project_list
+    # The same image exists in many regions
+    images = {}
+    for region in catalogue.search_regions(ctx.options.get("region")):
+        for image in catalogue.get_images(region):
+            images.setdefault(image['name'], image)
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(f"💿 {name}"[:100], value=name[:100]),
+            (name, image['type']),
+            )
+        for name, image in sorted(images.items())
+        ).search(ctx.value)
+
+async def get_flavor_list(ctx: discord.AutocompleteContext):
+    """
+    Function to build and serve an Autocomplete list of the catalogue flavors.
+    Limited to the regions matching the region option, when one is given.
+    """
+    if ctx.options["projectid"] is None:
+        return []
 
-async def get_user_list(ctx: discord.AutocompleteContext):
-    """ Function to build and serve an Autocomplete list of Users. """
     try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
+        catalogue = await catalogue_cache.get(ctx.options["projectid"])
+    except Exception as e:
+        logger.error(f'Autocomplete generation KO [{e}]')
+        return []
+
+    # The same flavor exists in many regions, and for each OS type
+    regions = set(catalogue.search_regions(ctx.options.get("region")))
+    flavors = {}
+    for (region, _), region_flavors in catalogue.flavors.items():
+        if region in regions:
+            for flavor in region_flavors.values():
+                flavors.setdefault(flavor['name'], flavor)
+    return ChoiceIndex(
+        (
+            discord.OptionChoice(
+                f"⚙️ {name} ({flavor['vcpus']}vCPU, {flavor['ram']}Go RAM)"[:100],
+                value=name[:100],
+                ),
+            (name,),
             )
+        for name, flavor in sorted(
+            flavors.items(),
+            key=lambda item: (item[1]['vcpus'], item[1]['ram'], item[0]),
+            )
+        ).search(ctx.value)
 
-        users = ovh_client.get(
-            f'/cloud/project/{ctx.options["projectid"]}/user'
+async def get_user_list(ctx: discord.AutocompleteContext):
+    """ Function to build and serve an Autocomplete list of Users. """
+    projectid = ctx.options["projectid"]
+    try:
+        user_index = await api_cache.get(
+            ('/cloud/project/{}/user', projectid),
+            lambda: fetch_user_index(projectid),
+            CACHE_TTL['user'],
             )
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
     else:
-        if users is None or len(users) == 0:
-            return []
-
-        user_list = []
-        for user in users:
-            user_list.append(
-                discord.OptionChoice(
-                    f"👤 {user['description']} ({user['username']})",
-                    value=f"{user['id']}",
-                    )
-                )
-
-        return user_list
+        return user_index.search(ctx.value)
 
 async def get_voucher_list(ctx: discord.AutocompleteContext):
     """ Function to build and serve an Autocomplete list of Vouchers. """
+    if ctx.options["projectid"] is None:
+        return []
+
+    projectid = ctx.options["projectid"]
     try:
-        ovh_client = ovh.Client(
-            endpoint=OVH_ENDPOINT,
-            application_key=OVH_AK,
-            application_secret=OVH_AS,
-            consumer_key=OVH_CK,
-            )
-        credits_id = ovh_client.get(
-            f'/cloud/project/{ctx.options["projectid"]}/credit'
+        voucher_index = await api_cache.get(
+            ('/cloud/project/{}/credit', projectid),
+            lambda: fetch_voucher_index(projectid),
+            CACHE_TTL['voucher'],
             )
     except Exception as e:
         logger.error(f'Autocomplete generation KO [{e}]')
         return []
     else:
-        if credits is None or len(credits) == 0:
-            return []
-        else:
-            voucher_list = []
-            for credit_id in credits_id:
-                credit = ovh_client.get(
-                    f'/cloud/project/{ctx.options["projectid"]}'
-                    f'/credit/{credit_id}'
-                    )
-                voucher_list.append(
-                    discord.OptionChoice(
-                        f"💳 {credit['id']} ({credit['voucher']})",
-                        value=f"{credit['id']}",
-                        )
-                    )
-            return voucher_list
+        return voucher_index.search(ctx.value)
@@ -0,0 +1,182 @@
+# -*- coding: utf8 -*-
+
+"""Module to keep the images & flavors of the Projects on disk."""
+
+import json
+import os
+import sqlite3
+import time
+
+from loguru import logger
+
+from variables import (
+    CACHE_TTL,
+    CLOUD_CATALOGUE_FILE,
+)
+
+from utils.cache import TTLCache
+from utils.concurrency import gather_bounded
+from utils.gateway import get_gateway
+from utils.matcher import ChoiceIndex
+
+
+class CloudCatalogue:
+    """
+    Images & flavors of a Project, indexed for Instance creation.
+    - images: {region: {image name: image}}
+    - flavors: {(region, osType): {flavor name: flavor}}
+    - data: what it was built from, as fetched
+    """
+    def __init__(self, data):
+        self.data = data
+        self.images = {}
+        self.flavors = {}
+        for image in data['images']:
+            self.images.setdefault(image['region'], {})[image['name']] = image
+        for flavor in data['flavors']:
+            key = (flavor['region'], flavor['osType'])
+            self.flavors.setdefault(key, {})[flavor['name']] = flavor
+
+    def regions(self):
+        """ Regions where an Instance can be created (images & flavors). """
+        return sorted(
+            region for region in self.images
+            if any(key[0] == region for key in self.flavors)
+            )
+
+    def get_images(self, region):
+        """ Images of a region, by name. """
+        return sorted(self.images.get(region, {}).values(), key=lambda image: image['name'])
+
+    def get_flavors(self, region, os_type):
+        """ Flavors of a region for an OS type, smallest first. """
+        return sorted(
+            self.flavors.get((region, os_type), {}).values(),
+            key=lambda flavor: (flavor['vcpus'], flavor['ram'], flavor['name']),
+            )
+
+    def search_regions(self, value):
+        """ Regions matching `value` (all of them if empty), best first. """
+        regions = self.regions()
+        return _search([(region, (region,)) for region in regions], value)
+
+    def search_images(self, region, value):
+        """ Images of a region matching `value` (all of them if empty), best first. """
+        images = self.get_images(region)
+        return _search([(image, (image['name'], image['type'])) for image in images], value)
+
+    def search_flavors(self, region, os_type, value):
+        """ Flavors of a region matching `value` (all of them if empty), best first. """
+        flavors = self.get_flavors(region, os_type)
+        return _search([(flavor, (flavor['name'],)) for flavor in flavors], value)
+
+    def get_image(self, region, name):
+        """ Returns an image. Raises KeyError if unknown. """
+        return self.images[region][name]
+
+    def get_flavor(self, region, os_type, name):
+        """ Returns a flavor. Raises KeyError if unknown. """
+        return self.flavors[(region, os_type)][name]
+
+
+def _search(entries, value):
+    """ Ranks catalogue entries against `value`, without dropping any match. """
+    if not value:
+        return [entry for entry, _ in entries]
+    return ChoiceIndex(entries).search(value, limit=len(entries), fuzzy=False)
+
+
+async def fetch_catalogue(projectid):
+    """ Function to fetch the CloudCatalogue of a Project (all regions). """
+    ovh_client = get_gateway()
+    images, flavors = await gather_bounded([
+        ovh_client.get(f'/cloud/project/{projectid}/image'),
+        ovh_client.get(f'/cloud/project/{projectid}/flavor'),
+        ])
+
+    # We only keep what Instance creation needs
+    return CloudCatalogue({
+        'images': [
+            {
+                'id': image['id'],
+                'name': image['name'],
+                'region': image['region'],
+                'type': image['type'],
+                }
+            for image in images or []
+            if image['status'] == 'active' and image['visibility'] == 'public'
+            ],
+        'flavors': [
+            {
+                'id': flavor['id'],
+                'name': flavor['name'],
+                'region': flavor['region'],
+                'osType': flavor['osType'],
+                'vcpus': flavor['vcpus'],
+                'ram': flavor['ram'],
+                'disk': flavor['disk'],
+                }
+            for flavor in flavors or []
+            if flavor['available']
+            ],
+        })
+
+
+class CatalogueCache(TTLCache):
+    """
+    TTLCache of the Projects catalogues, also kept in SQLite across restarts.
+    """
+    def __init__(self, path, ttl):
+        super().__init__()
+        self.ttl = ttl
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.connection = sqlite3.connect(path)
+        except Exception as e:
+            logger.error(f'Catalogue cache KO, falling back to memory ({path}) [{e}]')
+            self.connection = sqlite3.connect(':memory:')
+        else:
+            logger.debug(f'Catalogue cache OK ({path})')
+
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS catalogue ('
+                'project_id TEXT PRIMARY KEY, fetched_at REAL NOT NULL, data TEXT NOT NULL)'
+                )
+
+    async def get(self, projectid):  # pylint: disable=arguments-differ
+        """ Returns the CloudCatalogue of a Project. """
+        return await super().get(
+            ('/cloud/project/{}/catalogue', projectid),
+            lambda: fetch_catalogue(projectid),
+            self.ttl,
+            )
+
+    def _load(self, key, ttl):
+        """ Loads a catalogue from the disk, or returns None. """
+        row = self.connection.execute(
+            'SELECT fetched_at, data FROM catalogue WHERE project_id = ?',
+            (key[1],),
+            ).fetchone()
+        if row is None:
+            return None
+        # The disk keeps the wall clock, the memory the monotonic one
+        expires_at = time.monotonic() + row[0] + ttl - time.time()
+        self.entries[key] = (expires_at, CloudCatalogue(json.loads(row[1])))
+        return self.entries[key]
+
+    def _store(self, key, value):
+        """ Writes a catalogue to the disk. """
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO catalogue VALUES (?, ?, ?)',
+                (key[1], time.time(), json.dumps(value.data)),
+                )
+        logger.debug(
+            f'Catalogue refreshed ({key[1]}: {len(value.data["images"])} images, '
+            f'{len(value.data["flavors"])} flavors)'
+            )
+
+
+# Shared by every Instance creation
+catalogue_cache = CatalogueCache(CLOUD_CATALOGUE_FILE, CACHE_TTL['catalogue'])
@@ -0,0 +1,84 @@
+# -*- coding: utf8 -*-
+
+"""Module to index the Instances of every Project."""
+
+from variables import (
+    CACHE_TTL,
+)
+
+from utils.cache import api_cache
+from utils.gateway import get_gateway
+from utils.matcher import ChoiceIndex
+
+from ._scanner import scan_projects
+
+
+class InstanceIndex:
+    """
+    Instances of every Project, searchable by name, IP, region or ID.
+    - instances: [{projectId, id, name, region, flavor, status, ips}]
+    - by_id: {instance id: instance}
+    - errors: {project id: exception}, for the Projects that failed
+    """
+    def __init__(self, scanned):
+        self.instances = []
+        self.by_id = {}
+        self.errors = {}
+        for project_id, instances in scanned:
+            if isinstance(instances, Exception):
+                # Suspended Projects cannot be queried, for instance
+                self.errors[project_id] = instances
+                continue
+            for instance in instances:
+                if 'nodepool' in instance['name']:
+                    # We want to exclude K8s nodepool nodes
+                    # Too much trouble if someone mistakenly kills one
+                    continue
+                entry = {
+                    'projectId': project_id,
+                    'id': instance['id'],
+                    'name': instance['name'],
+                    'region': instance['region'],
+                    'flavor': instance['planCode'].split('.')[0],
+                    'status': instance['status'],
+                    'ips': [
+                        ip_address['ip']
+                        for ip_address in instance.get('ipAddresses') or []
+                        ],
+                    }
+                self.instances.append(entry)
+                self.by_id[entry['id']] = entry
+
+        self.index = ChoiceIndex(
+            (
+                instance,
+                (instance['name'], *instance['ips'], instance['region'], instance['id']),
+                )
+            for instance in self.instances
+            )
+
+    def search(self, value, limit=None, fuzzy=False):
+        """ Returns the Instances matching `value` (all of them if empty). """
+        return self.index.search(value, limit=limit or len(self.instances), fuzzy=fuzzy)
+
+
+async def fetch_instance_index():
+    """ Function to fetch the Instances of every Project, concurrently. """
+    ovh_client = get_gateway()
+    scanned = await scan_projects(
+        ovh_client,
+        lambda project_id: ovh_client.get(f'/cloud/project/{project_id}/instance'),
+        )
+    return InstanceIndex(scanned)
+
+
+async def get_instance_index():
+    """
+    Function to serve the cross-Project InstanceIndex.
+    Served from memory, refreshed in the background once stale.
+    """
+    return await api_cache.get(
+        ('/cloud/project/*/instance',),
+        fetch_instance_index,
+        CACHE_TTL['instance_index'],
+        )
@@ -0,0 +1,135 @@
+# -*- coding: utf8 -*-
+
+"""Module to create/delete Instances in batches, and wait for them to be ACTIVE."""
+
+import asyncio
+import fnmatch
+import time
+
+from utils.concurrency import gather_bounded
+
+# Upper bound of Instances created by one interaction
+INSTANCE_QUANTITY_LIMIT = 50
+# Polling backoff (seconds): first delay, multiplied each time up to the max
+POLL_DELAY = 5
+POLL_FACTOR = 1.5
+POLL_MAX_DELAY = 30
+# An Instance not ACTIVE after that is reported as failed
+POLL_TIMEOUT = 900
+
+
+def get_instance_names(pattern, quantity, region, flavor):
+    """
+    Builds the Instance names from a pattern.
+    Placeholders: {index} (zero-padded), {region}, {flavor}.
+    Without {index}, all the Instances get the same name (bulk creation).
+    """
+    if pattern is None:
+        pattern = '{flavor}-imabot' if quantity == 1 else '{flavor}-imabot-{index}'
+    width = len(str(quantity))
+    return [
+        pattern
+        .replace('{index}', str(index).zfill(width))
+        .replace('{region}', region.lower())
+        .replace('{flavor}', flavor)
+        for index in range(1, quantity + 1)
+        ]
+
+
+async def create_instances(ovh_client, projectid, names, **params):
+    """
+    Creates one Instance per name.
+    Identical names are created with one bulk API call,
+    other ones with concurrent (bounded) API calls.
+    Returns a list of (name, instance or exception).
+    """
+    if len(names) > 1 and len(set(names)) == 1:
+        instances = await ovh_client.post(
+            f'/cloud/project/{projectid}/instance/bulk',
+            name=names[0],
+            number=len(names),
+            **params,
+            )
+        return [(instance['name'], instance) for instance in instances]
+
+    results = await gather_bounded(
+        (
+            ovh_client.post(
+                f'/cloud/project/{projectid}/instance',
+                name=name,
+                **params,
+                )
+            for name in names
+            ),
+        return_exceptions=True,
+        )
+    return list(zip(names, results))
+
+
+async def wait_for_active(ovh_client, projectid, instance_id):
+    """
+    Polls an Instance, with backoff, until it is ACTIVE.
+    Returns the Instance. Raises if it fails or takes too long.
+    """
+    deadline = time.monotonic() + POLL_TIMEOUT
+    delay = POLL_DELAY
+    while True:
+        await asyncio.sleep(delay)
+        instance = await ovh_client.get(f'/cloud/project/{projectid}/instance/{instance_id}')
+        if instance['status'] == 'ACTIVE':
+            return instance
+        if instance['status'] == 'ERROR':
+            raise RuntimeError('Instance in ERROR status')
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f'Instance still {instance["status"]} after {POLL_TIMEOUT}s')
+        delay = min(delay * POLL_FACTOR, POLL_MAX_DELAY)
+
+
+def get_public_ipv4(instance):
+    """ Returns the public IPv4 of an Instance, or None. """
+    for ip_address in instance.get('ipAddresses') or []:
+        if ip_address['type'] == 'public' and ip_address['version'] == 4:
+            return ip_address['ip']
+    return None
+
+
+def select_instances(instances, ids=None, pattern=None, region=None):
+    """
+    Selects the Instances matching all the given criteria:
+    - ids: list of Instance IDs
+    - pattern: glob on the Instance name (web-*)
+    - region: region name (GRA9)
+    K8s nodepool nodes are never selected.
+    """
+    selected = []
+    for instance in instances:
+        if 'nodepool' in instance['name']:
+            # We want to exclude K8s nodepool nodes
+            # Too much trouble if someone mistakenly kills one
+            continue
+        if ids and instance['id'] not in ids:
+            continue
+        if pattern and not fnmatch.fnmatchcase(instance['name'], pattern):
+            continue
+        if region and instance['region'].upper() != region.upper():
+            continue
+        selected.append(instance)
+    return selected
+
+
+async def delete_instances(ovh_client, projectid, instances):
+    """
+    Deletes Instances with concurrent (bounded) API calls.
+    Returns a list of (instance, None or exception).
+    """
+    results = await gather_bounded(
+        (
+            ovh_client.delete(f'/cloud/project/{projectid}/instance/{instance["id"]}')
+            for instance in instances
+            ),
+        return_exceptions=True,
+        )
+    return [
+        (instance, result if isinstance(result, Exception) else None)
+        for instance, result in zip(instances, results)
+        ]
@@ -0,0 +1,20 @@
+# -*- coding: utf8 -*-
+
+"""Module to run the same queries over every Project."""
+
+from utils.concurrency import gather_bounded
+
+
+async def scan_projects(ovh_client, scan):
+    """
+    Function to run `scan(project_id)` over every Project concurrently.
+    Returns a list of (project_id, result) in the API order.
+    If a Project fails, its result is the exception raised by `scan`:
+    one faulty Project does not abort the whole report.
+    """
+    projects_id = await ovh_client.get('/cloud/project')
+    results = await gather_bounded(
+        (scan(project_id) for project_id in projects_id),
+        return_exceptions=True,
+        )
+    return list(zip(projects_id, results))
@@ -2,80 +2,186 @@
 
 """ Views declarations. """
 
+import asyncio
+import textwrap
+
 import discord
 
 from loguru import logger
+from tabulate import tabulate
 
 from variables import (
-    FLAVOR_ID_DATA,
-    IMAGE_ID_DATA,
+    ANSIBLE_HOSTS_FILE,
+    ANSIBLE_PROFILE,
+    DISCORD_GROUP_GENERAL,
     USER_DATA_WITH_ANSIBLE,
 )
 
+from utils.cache import api_cache
+from utils.jobs import job_manager
+
+from ..ansible._inventory import (
+    assign_hosts,
+    inventory,
+)
+from ..ansible._profiles import get_profile_env
+from ..ansible._runner import (
+    get_command,
+    run_ansible_job,
+    wait_for_hosts,
+)
+
+from ._provisioning import (
+    create_instances,
+    delete_instances,
+    get_instance_names,
+    get_public_ipv4,
+    wait_for_active,
+)
+
+# Discord Select dropdowns are limited to 25 options
+SELECT_OPTIONS_LIMIT = 25
+# Rows of the Instances tables (embed descriptions are limited to 4096 characters)
+TABLE_ROWS_LIMIT = 40
+OS_TYPE_EMOJI = {
+    'linux': '🐧',
+    'windows': '🪟',
+    }
+
+
+def fill_select(select, options, noun):
+    """
+    Puts up to SELECT_OPTIONS_LIMIT options in a Select.
+    Beyond that, the placeholder tells how many are hidden, and how to filter them.
+    """
+    select.disabled = len(options) == 0
+    # A Select needs at least one option, even disabled
+    select.options = options[:SELECT_OPTIONS_LIMIT] or [
+        discord.SelectOption(label=f"No {noun} available")
+        ]
+    if len(options) > SELECT_OPTIONS_LIMIT:
+        select.placeholder = (
+            f"Choose the OpenStack {noun} ({SELECT_OPTIONS_LIMIT} of {len(options)}, "
+            f"filter with the `{noun}` option)"
+            )
+    else:
+        select.placeholder = f"Choose the OpenStack {noun}"
+
 
 class InstanceCreationView(discord.ui.View):
-    """ Custom View to display Select dropdowns for Instance creation. """
-    def __init__(self, ctx, ovh_client, projectid, sshkeyid):
-        super().__init__(timeout=30)
+    """
+    Custom View to display Select dropdowns for Instance creation.
+    Options come from the Project CloudCatalogue: images and flavors
+    are only proposed once the region (and the image) are chosen.
+    The region/image/flavor command options filter them (25 per Select at most).
+    """
+    def __init__(
+        self,
+        ctx,
+        ovh_client,
+        projectid,
+        sshkeyid,
+        catalogue,
+        quantity=1,
+        name_pattern=None,
+        ansible_section=None,
+        playbooks=None,
+        filters=None,
+    ):
+        # More time than a static View, as the Selects are chained
+        super().__init__(timeout=60)
         self.values = {}
         self.ctx = ctx
         self.ovh_client = ovh_client
         self.projectid = projectid
         self.sshkeyid = sshkeyid
+        self.catalogue = catalogue
+        self.quantity = quantity
+        self.name_pattern = name_pattern
+        self.ansible_section = ansible_section
+        self.playbooks = playbooks or []
+        # {'region': ..., 'image': ..., 'flavor': ...}, searched in the catalogue
+        self.filters = filters or {}
 
-    @discord.ui.select(
-        placeholder = "Choose the OpenStack region",
-        min_values = 1,
-        max_values = 1,
-        options = [
-            discord.SelectOption(label="🇫🇷 Gravelines (GRA9)", value="GRA9"),
-            discord.SelectOption(label="🇵🇱 Gravelines (WAW1)", value="WAW1"),
-            discord.SelectOption(label="🇬🇧 Gravelines (UK1)", value="UK1"),
-            discord.SelectOption(label="🇨🇦 Gravelines (BHS1)", value="BHS1"),
-        ]
-    )
-    async def select_callback_region(self, select, interaction):
+        self.select_region = discord.ui.Select(row=0)
+        fill_select(
+            self.select_region,
+            [
+                discord.SelectOption(label=region, value=region)
+                for region in catalogue.search_regions(self.filters.get('region'))
+                ],
+            'region',
+            )
+        self.select_region.callback = self.select_callback_region
+        self.select_image = discord.ui.Select(
+            placeholder="Choose the OpenStack image",
+            options=[discord.SelectOption(label="Choose the region first")],
+            disabled=True,
+            row=1,
+            )
+        self.select_image.callback = self.select_callback_image
+        self.select_flavor = discord.ui.Select(
+            placeholder="Choose the OpenStack flavor",
+            options=[discord.SelectOption(label="Choose the image first")],
+            disabled=True,
+            row=2,
+            )
+        self.select_flavor.callback = self.select_callback_flavor
+        for select in (self.select_region, self.select_image, self.select_flavor):
+            self.add_item(select)
+
+    async def select_callback_region(self, interaction):
         """ Callback for region Select """
-        self.values['region'] = select.values[0]
-        select.disabled = True
+        self.values['region'] = self.select_region.values[0]
+        self.select_region.disabled = True
+        # The images depend on the region
+        options = [
+            discord.SelectOption(
+                label=f"{OS_TYPE_EMOJI.get(image['type'], '💿')} {image['name']}"[:100],
+                value=image['name'][:100],
+                )
+            for image in self.catalogue.search_images(
+                self.values['region'],
+                self.filters.get('image'),
+                )
+            ]
+        fill_select(self.select_image, options, 'image')
         await interaction.response.edit_message(view=self)
 
-    @discord.ui.select(
-        placeholder = "Choose the OpenStack flavor",
-        min_values = 1,
-        max_values = 1,
+    async def select_callback_image(self, interaction):
+        """ Callback for image Select """
+        self.values['image'] = self.select_image.values[0]
+        self.select_image.disabled = True
+        # The flavors depend on the region, and on the OS type of the image
+        image = self.catalogue.get_image(self.values['region'], self.values['image'])
         options = [
-            discord.SelectOption(label="⚙️ Discovery (1vCPU, 2Go RAM)", value="d2-2"),
-            discord.SelectOption(label="⚙️ Discovery (2vCPU, 4Go RAM)", value="d2-4"),
-            discord.SelectOption(label="⚙️ Discovery (4vCPU, 8Go RAM)", value="d2-8"),
-        ]
-    )
-    async def select_callback_flavor(self, select, interaction):
-        """ Callback for flavor Select """
-        self.values['flavor'] = select.values[0]
-        select.disabled = True
+            discord.SelectOption(
+                label=(
+                    f"⚙️ {flavor['name']} "
+                    f"({flavor['vcpus']}vCPU, {flavor['ram']}Go RAM)"
+                    )[:100],
+                value=flavor['name'][:100],
+                )
+            for flavor in self.catalogue.search_flavors(
+                self.values['region'],
+                image['type'],
+                self.filters.get('flavor'),
+                )
+            ]
+        fill_select(self.select_flavor, options, 'flavor')
         await interaction.response.edit_message(view=self)
 
-    @discord.ui.select(
-        placeholder = "Choose the OpenStack image",
-        min_values = 1,
-        max_values = 1,
-        options = [
-            discord.SelectOption(label="🐧 Debian 11", value="Debian 11"),
-            discord.SelectOption(label="🐧 Ubuntu 22.10", value="Ubuntu 22.10"),
-            discord.SelectOption(label="🐧 Fedora 36", value="Fedora 36"),
-        ]
-    )
-    async def select_callback_image(self, select, interaction):
-        """ Callback for image Select """
-        self.values['image'] = select.values[0]
-        select.disabled = True
+    async def select_callback_flavor(self, interaction):
+        """ Callback for flavor Select """
+        self.values['flavor'] = self.select_flavor.values[0]
+        self.select_flavor.disabled = True
         await interaction.response.edit_message(view=self)
 
     @discord.ui.button(
         label="Let's go!",
         style=discord.ButtonStyle.green,
         emoji="✅",
+        row=3,
         )
     async def button_callback_ok(self, button, interaction):
         """ Callback for OK Button """
@@ -83,7 +189,7 @@ class InstanceCreationView(discord.ui.View):
         await interaction.response.defer()
         answer = await interaction.followup.send(
             embed=discord.Embed(
-                description="The Instance creation will start shortly",
+                description=f"The creation of {self.quantity} Instance(s) will start shortly",
                 colour=discord.Colour.green()
                 ),
             )
@@ -103,8 +209,14 @@ class InstanceCreationView(discord.ui.View):
             return
 
         try:
-            image_id = IMAGE_ID_DATA[self.values['region']][self.values['image']]
-            flavor_id = FLAVOR_ID_DATA[self.values['region']][self.values['flavor']]
+            # No API call here, the catalogue is already in memory
+            image = self.catalogue.get_image(self.values['region'], self.values['image'])
+            image_id = image['id']
+            flavor_id = self.catalogue.get_flavor(
+                self.values['region'],
+                image['type'],
+                self.values['flavor'],
+                )['id']
         except Exception as e:
             msg = f"Unable to comply. Can't find imageId/flavorId [{e}]"
             logger.error(msg)
@@ -115,17 +227,24 @@ class InstanceCreationView(discord.ui.View):
             await answer.edit(embed=embed)
             return
 
+        names = get_instance_names(
+            self.name_pattern,
+            self.quantity,
+            self.values['region'],
+            self.values['flavor'],
+            )
         try:
-            res = self.ovh_client.post(
-                f'/cloud/project/{self.projectid}/instance',
+            results = await create_instances(
+                self.ovh_client,
+                self.projectid,
+                names,
                 flavorId=flavor_id,
                 imageId=image_id,
                 monthlyBilling=False,
-                name="d2-2-imabot",
                 region=self.values['region'],
                 sshKeyId=self.sshkeyid,
                 userData=USER_DATA_WITH_ANSIBLE,
-            )
+                )
         except Exception as e:
             msg = f'API calls KO (Instance creation) [{e}]'
             logger.error(msg)
@@ -138,22 +257,302 @@ class InstanceCreationView(discord.ui.View):
         else:
             msg = 'API calls OK (Instance creation)'
             logger.debug(msg)
+            api_cache.invalidate('/cloud/project/{}/instance', self.projectid)
+            api_cache.invalidate('/cloud/project/*/instance')
 
+        # We track every Instance: {id (or name): [name, status, IPv4]}, in order
+        states = {}
+        instances = []
+        for name, result in results:
+            if isinstance(result, Exception):
+                logger.error(f'API calls KO (Instance creation: {name}) [{result}]')
+                states[name] = [name, f'KO ({result})', '-']
+            else:
+                states[result['id']] = [name, result['status'], '-']
+                instances.append(result)
+
+        def render():
+            ready = len([state for state in states.values() if state[1] == 'ACTIVE'])
+            failed = len([state for state in states.values() if state[1].startswith('KO')])
+            if ready == len(states):
+                colour = discord.Colour.green()
+            elif ready + failed == len(states):
+                colour = discord.Colour.orange()
+            else:
+                colour = discord.Colour.blue()
             embed = discord.Embed(
-                title="An Instance is spawning",
-                colour=discord.Colour.green()
+                title=f"{ready}/{len(states)} Instance(s) ready",
+                colour=colour,
+                )
+            # We start with the headers
+            embed_field_value_table = {
+                'Instance Name': [],
+                'Status': [],
+                'IPv4': [],
+                }
+            for name, status, ipv4 in list(states.values())[:TABLE_ROWS_LIMIT]:
+                embed_field_value_table['Instance Name'].append(textwrap.shorten(
+                    name,
+                    width=30,
+                    placeholder="...",
+                    ))
+                embed_field_value_table['Status'].append(textwrap.shorten(
+                    status,
+                    width=30,
+                    placeholder="...",
+                    ))
+                embed_field_value_table['IPv4'].append(ipv4)
+            embed.description = (
+                '```' +
+                tabulate(
+                    embed_field_value_table,
+                    headers='keys',
+                    tablefmt='pretty',
+                    stralign='right',
+                    ) +
+                '```'
                 )
+            if len(states) > TABLE_ROWS_LIMIT:
+                embed.description += f'\n... and {len(states) - TABLE_ROWS_LIMIT} more'
+            embed.set_footer(
+                text=f"Project ID: {self.projectid} | Region: {self.values['region']}"
+                )
+            return embed
 
-            embed_field_name = f"[{res['id']}] {res['name']}"
-            embed_field_value  = f"> Status : `{res['status']}`\n"
-            embed_field_value += f"> Region : `{res['region']}`\n"
-            embed_field_value += f"> OS : `{res['flavor']['osType']}`\n"
-            embed_field_value += f"> Flavor : `{res['flavor']['name']}`\n"
+        try:
+            await answer.edit(embed=render())
+        except Exception as e:
+            # The Instances exist: they are still polled (and registered)
+            logger.warning(f'Instance creation update KO [{e}]')
+        try:
+            # The Selects are not needed anymore
+            await self.ctx.delete()
+        except Exception as e:
+            logger.warning(f'Instance creation update KO [{e}]')
 
-            embed.add_field(
-                name=f'`{embed_field_name}`',
-                value=embed_field_value,
-                inline=True,
-                )
+        async def wait(instance):
+            try:
+                return instance['id'], await wait_for_active(
+                    self.ovh_client,
+                    self.projectid,
+                    instance['id'],
+                    ), None
+            except Exception as e:
+                return instance['id'], None, e
+
+        # All the Instances are polled at the same time,
+        # and each one is reported as soon as it is ACTIVE
+        for next_done in asyncio.as_completed([wait(instance) for instance in instances]):
+            instance_id, instance, error = await next_done
+            if error is not None:
+                logger.error(f'Instance polling KO ({instance_id}) [{error}]')
+                states[instance_id][1:] = [f'KO ({error})', '-']
+            else:
+                states[instance_id][1:] = [instance['status'], get_public_ipv4(instance) or '-']
+            try:
+                await answer.edit(embed=render())
+            except Exception as e:
+                # The followup may have expired (15 minutes)
+                logger.warning(f'Instance creation update KO [{e}]')
+        logger.debug('Instance creation done')
+
+        # Optional post-creation stage: Ansible inventory, then Playbooks
+        ipv4s = [
+            ipv4 for _, status, ipv4 in states.values()
+            if status == 'ACTIVE' and ipv4 != '-'
+            ]
+        if self.ansible_section is None or len(ipv4s) == 0:
+            return
+
+        embed = render()
+        embed.add_field(
+            name='Ansible',
+            value=await self.register_hosts(interaction, ipv4s),
+            inline=False,
+            )
+        try:
             await answer.edit(embed=embed)
-            await self.ctx.delete()
+        except Exception as e:
+            logger.warning(f'Instance creation update KO [{e}]')
+
+    async def register_hosts(self, interaction, ipv4s):
+        """
+        Assigns the new hosts in the Ansible inventory section,
+        and runs the Playbooks against them (as a background Job).
+        Returns the outcome, for display.
+        """
+        try:
+            # Same code path as /{DISCORD_GROUP_ANSIBLE} hosts assign
+            await inventory.update(
+                lambda config: assign_hosts(config, self.ansible_section, ipv4s)
+                )
+        except Exception as e:
+            msg = f'Host assign KO [{e}]'
+            logger.error(msg)
+            return f':no_entry: {msg}'
+
+        outcome = f'{len(ipv4s)} host(s) assigned in `[{self.ansible_section}]`'
+        if len(self.playbooks) == 0:
+            return outcome
+
+        limit = ','.join(ipv4s)
+        commands = [
+            (f'📝 {playbook}', get_command(playbook, limit, None, None))
+            for playbook in self.playbooks
+            ]
+        try:
+            env = get_profile_env(ANSIBLE_PROFILE)
+            job_message = await interaction.followup.send(
+                embed=discord.Embed(
+                    description=f"Waiting for `{limit}` to answer before running the Playbooks",
+                    colour=discord.Colour.blue()
+                    ),
+                )
+
+            async def work(job):
+                # New hosts only answer once booted and set up by cloud-init
+                await wait_for_hosts(ANSIBLE_HOSTS_FILE, limit, env=env)
+                await run_ansible_job(job, commands, job_message.edit, env=env)
+
+            job = job_manager.submit(
+                name=f"playbook run {','.join(self.playbooks)}",
+                target=limit,
+                author=self.ctx.author.name,
+                work=work,
+                # The Playbooks are limited to the new hosts
+                hosts=set(ipv4s),
+                )
+        except Exception as e:
+            msg = f'ansible-playbook command KO [{e}]'
+            logger.error(msg)
+            return f'{outcome}\n:no_entry: {msg}'
+        return (
+            f'{outcome}\n'
+            f'Playbooks: Job **#{job.id}** queued '
+            f'(`/{DISCORD_GROUP_GENERAL} jobs jobid:{job.id}`)'
+            )
+
+
+class InstanceDeletionView(discord.ui.View):
+    """ Custom View to confirm the deletion of a set of Instances. """
+    def __init__(self, ctx, ovh_client, projectid, instances):
+        super().__init__(timeout=60)
+        self.ctx = ctx
+        self.ovh_client = ovh_client
+        self.projectid = projectid
+        self.instances = instances
+        self.confirm.label = f"Delete {len(instances)} Instance(s)"
+
+    def render(self, title, outcomes=None):
+        """ Renders the Instances (and the deletion outcomes) as an Embed. """
+        # We start with the headers
+        embed_field_value_table = {
+            'Instance Name': [],
+            'Region': [],
+            'Flavor': [],
+            }
+        if outcomes is not None:
+            embed_field_value_table['Result'] = []
+        for index, instance in enumerate(self.instances[:TABLE_ROWS_LIMIT]):
+            embed_field_value_table['Instance Name'].append(textwrap.shorten(
+                instance['name'],
+                width=30,
+                placeholder="...",
+                ))
+            embed_field_value_table['Region'].append(instance['region'])
+            embed_field_value_table['Flavor'].append(instance['planCode'].split('.')[0])
+            if outcomes is not None:
+                error = outcomes[index]
+                embed_field_value_table['Result'].append(
+                    'Deleted' if error is None else textwrap.shorten(
+                        f'KO ({error})',
+                        width=30,
+                        placeholder="...",
+                        )
+                    )
+
+        if outcomes is None:
+            colour = discord.Colour.orange()
+        elif all(error is None for error in outcomes):
+            colour = discord.Colour.green()
+        else:
+            colour = discord.Colour.red()
+        embed = discord.Embed(
+            title=title,
+            description=(
+                '```' +
+                tabulate(
+                    embed_field_value_table,
+                    headers='keys',
+                    tablefmt='pretty',
+                    stralign='right',
+                    ) +
+                '```'
+                ),
+            colour=colour,
+            )
+        if len(self.instances) > TABLE_ROWS_LIMIT:
+            embed.description += f'\n... and {len(self.instances) - TABLE_ROWS_LIMIT} more'
+        embed.set_footer(text=f"Project ID: {self.projectid}")
+        return embed
+
+    async def interaction_check(self, interaction):
+        """ Only the author of the command can confirm it. """
+        return interaction.user.id == self.ctx.author.id
+
+    async def on_timeout(self):
+        """ Nothing is deleted without an answer. """
+        self.disable_all_items()
+        try:
+            await self.ctx.interaction.edit_original_response(
+                embed=self.render('Instance deletion cancelled (timeout)'),
+                view=self,
+                )
+        except Exception as e:
+            logger.warning(f'Instance deletion update KO [{e}]')
+
+    @discord.ui.button(
+        label="Delete",
+        style=discord.ButtonStyle.danger,
+        emoji="🗑️",
+        )
+    async def confirm(self, button, interaction):
+        """ Callback for Delete Button """
+        self.stop()
+        self.disable_all_items()
+        await interaction.response.edit_message(
+            embed=self.render(f'Deleting {len(self.instances)} Instance(s)'),
+            view=self,
+            )
+
+        # All the deletions run at the same time (bounded)
+        results = await delete_instances(self.ovh_client, self.projectid, self.instances)
+        outcomes = [error for _, error in results]
+        for instance, error in results:
+            if error is not None:
+                logger.error(f"API calls KO (Instance deletion: {instance['id']}) [{error}]")
+        api_cache.invalidate('/cloud/project/{}/instance', self.projectid)
+        api_cache.invalidate('/cloud/project/*/instance')
+
+        deleted = len([error for error in outcomes if error is None])
+        await interaction.edit_original_response(
+            embed=self.render(
+                f'{deleted}/{len(self.instances)} Instance(s) deleted',
+                outcomes,
+                ),
+            view=self,
+            )
+
+    @discord.ui.button(
+        label="Cancel",
+        style=discord.ButtonStyle.grey,
+        emoji="✖️",
+        )
+    async def cancel(self, button, interaction):
+        """ Callback for Cancel Button """
+        self.stop()
+        self.disable_all_items()
+        await interaction.response.edit_message(
+            embed=self.render('Instance deletion cancelled'),
+            view=self,
+            )
@@ -2,6 +2,7 @@
 Discord command definition for /{DISCORD_GROUP_PCI} instance
 """
 import json
+import textwrap
 
 import discord
 
@@ -16,12 +17,35 @@ from variables import (
     ROLE_TECH_RW,
 )
 
+from utils.embeds import group_embeds
+
+from ..ansible._autocomplete import (
+    get_playbook_list,
+    get_section_list,
+)
+from ..ansible._catalogue import get_playbooks
 from ._autocomplete import (
+    get_flavor_list,
+    get_image_list,
     get_instance_list,
     get_project_list,
+    get_region_list,
     get_sshkey_list,
 )
-from ._views import InstanceCreationView
+from ._catalogue import catalogue_cache
+from ._index import get_instance_index
+from ._provisioning import (
+    INSTANCE_QUANTITY_LIMIT,
+    select_instances,
+)
+from ._views import (
+    InstanceCreationView,
+    InstanceDeletionView,
+)
+
+# Rows of the cross-Project Instances table displayed in each embed
+INSTANCES_PER_PAGE = 25
+
 
 def instance(group_pci, ovh_client, my_nic):
     """
@@ -47,13 +71,13 @@ def instance(group_pci, ovh_client, my_nic):
         )
     @option(
         "projectid",
-        description="Project ID",
+        description="Project ID (all Projects for list/show when omitted)",
         autocomplete=get_project_list,
-        required=True,
+        required=False,
         )
     @option(
         "instanceid",
-        description="Instance ID",
+        description="Instance ID (comma-separated IDs to delete several)",
         autocomplete=get_instance_list,
         required=False,
         )
@@ -63,20 +87,78 @@ def instance(group_pci, ovh_client, my_nic):
         autocomplete=get_sshkey_list,
         required=False,
         )
+    @option(
+        "quantity",
+        description=f"Number of Instances to create (max {INSTANCE_QUANTITY_LIMIT})",
+        required=False,
+        default=1,
+        )
+    @option(
+        "name_pattern",
+        description=(
+            "Instance names: {index}/{region}/{flavor} placeholders (create), "
+            "glob (delete)"
+            ),
+        required=False,
+        )
+    @option(
+        "ansible_section",
+        description="Ansible inventory section to assign the new Instances in",
+        autocomplete=get_section_list,
+        required=False,
+        )
+    @option(
+        "playbook",
+        description="Ansible Playbook(s) to run on the new Instances (needs ansible_section)",
+        autocomplete=get_playbook_list,
+        required=False,
+        )
+    @option(
+        "region",
+        description="Region: filters the regions to create in, selects the Instances to delete",
+        autocomplete=get_region_list,
+        required=False,
+        )
+    @option(
+        "image",
+        description="Image: filters the images to create from (name or OS type)",
+        autocomplete=get_image_list,
+        required=False,
+        )
+    @option(
+        "flavor",
+        description="Flavor: filters the flavors to create with",
+        autocomplete=get_flavor_list,
+        required=False,
+        )
+    @option(
+        "search",
+        description="Search Instances of all Projects by name, IP, region or ID (list)",
+        required=False,
+        )
     async def instance(
         ctx,
         action: str,
         projectid: str,
         instanceid: str,
         sshkeyid: str,
+        quantity: int,
+        name_pattern: str,
+        ansible_section: str,
+        playbook: str,
+        region: str,
+        image: str,
+        flavor: str,
+        search: str,
     ):
         """
         This part performs actions on Public Cloud Instances
         So far:
-        - list: Displays the list of ALL Instances
+        - list: Displays the list of ALL Instances (of a Project, or of all of them)
         - show: Displays the details of a specific Instance
-        - delete: Deletes a specific Instance
-        - create: Creates a new Instance
+        - delete: Deletes Instances (by IDs, name glob and/or region) after a preview
+        - create: Creates new Instances (and waits for them to be ACTIVE)
+          then optionally assigns them in Ansible and runs Playbooks
         """
         # As we rely on potentially a lot of API calls, we need time to answer
         await ctx.defer()
@@ -91,7 +173,88 @@ def instance(group_pci, ovh_client, my_nic):
             f'{action} {projectid} {instanceid}'
             )
 
-        if action == 'list':
+        if action == 'list' and (projectid is None or search is not None):
+            # This command will require basic TECH_RO role, checked before
+            # Every Project at once, served from the cross-Project index
+            try:
+                instance_index = await get_instance_index()
+            except Exception as e:
+                msg = f'API calls KO [{e}]'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.red()
+                )
+                await ctx.respond(embed=embed)
+                return
+
+            instances = [
+                instance for instance in instance_index.search(search)
+                if projectid is None or instance['projectId'] == projectid
+                ]
+            if len(instances) == 0:
+                embed = discord.Embed(
+                    title=f'**{my_nic}**',
+                    description=f'No Instances matching `{search}`' if search else 'No Instances',
+                    colour=discord.Colour.orange()
+                )
+                await ctx.respond(embed=embed)
+                return
+
+            # One table per page, to stay under the embed size limit
+            embeds = []
+            for page in range(0, len(instances), INSTANCES_PER_PAGE):
+                # We start with the headers
+                embed_field_value_table = {
+                    'Project': [],
+                    'Instance Name': [],
+                    'Region': [],
+                    'Flavor': [],
+                    'Status': [],
+                    'IPv4': [],
+                }
+                for instance in instances[page:page + INSTANCES_PER_PAGE]:
+                    embed_field_value_table['Project'].append(instance['projectId'][:8])
+                    embed_field_value_table['Instance Name'].append(textwrap.shorten(
+                        instance['name'],
+                        width=25,
+                        placeholder="...",
+                        ))
+                    embed_field_value_table['Region'].append(instance['region'])
+                    embed_field_value_table['Flavor'].append(instance['flavor'])
+                    embed_field_value_table['Status'].append(instance['status'])
+                    embed_field_value_table['IPv4'].append(next(
+                        (ip for ip in instance['ips'] if '.' in ip),
+                        '-',
+                        ))
+
+                embeds.append(
+                    discord.Embed(
+                        description=(
+                            '```' +
+                            tabulate(
+                                embed_field_value_table,
+                                headers='keys',
+                                tablefmt='pretty',
+                                stralign='right',
+                                ) +
+                            '```'
+                            ),
+                        colour=discord.Colour.green(),
+                        )
+                    )
+            embeds[0].title = f'**{my_nic}**: {len(instances)} Instance(s)'
+            if instance_index.errors:
+                # Those Projects failed, the others are still displayed
+                embeds[-1].set_footer(
+                    text=f'{len(instance_index.errors)} Project(s) could not be queried'
+                    )
+
+            for group in group_embeds(embeds):
+                await ctx.respond(embeds=group)
+            logger.debug(f'[#{channel}][{name}] └──> Queries OK')
+            return
+        elif action == 'list':
             # This command will require basic TECH_RO role, checked before
             try:
                 embed = discord.Embed(
@@ -105,7 +268,7 @@ def instance(group_pci, ovh_client, my_nic):
                     'Flavor': [],
                 }
 
-                project = ovh_client.get(f'/cloud/project/{projectid}')
+                project = await ovh_client.get(f'/cloud/project/{projectid}')
                 if project['status'] == 'suspended':
                     # Suspended Projects cannot be queried later
                     embed.add_field(
@@ -114,7 +277,7 @@ def instance(group_pci, ovh_client, my_nic):
                         inline=False,
                         )
 
-                instances = ovh_client.get(
+                instances = await ovh_client.get(
                     f'/cloud/project/{projectid}/instance'
                     )
                 if len(instances) == 0:
@@ -173,6 +336,13 @@ def instance(group_pci, ovh_client, my_nic):
                 return
         elif action == 'show':
             # This command will require basic TECH_RO role, checked before
+            if projectid is None and instanceid is not None:
+                try:
+                    # We locate the Project of the Instance in the index
+                    projectid = (await get_instance_index()).by_id[instanceid]['projectId']
+                except Exception as e:
+                    logger.warning(f'Instance {instanceid} not found in the index [{e}]')
+
             if projectid is None or instanceid is None:
                 logger.error('Missing mandatory option(s)')
                 msg = (
@@ -188,7 +358,7 @@ def instance(group_pci, ovh_client, my_nic):
                 return
 
             try:
-                instance = ovh_client.get(
+                instance = await ovh_client.get(
                     f'/cloud/project/{projectid}/instance/{instanceid}'
                     )
             except Exception as e:
@@ -231,12 +401,15 @@ def instance(group_pci, ovh_client, my_nic):
                 await ctx.respond(embed=embed)
                 return
 
-            if projectid is None or instanceid is None:
+            if projectid is None or all(
+                    selector is None for selector in (instanceid, name_pattern, region)
+                    ):
                 logger.error('Missing mandatory option(s)')
                 msg = (
                     'Check that you provided all variables: \n'
                     ' - `projectid` \n'
-                    ' - `instanceid` \n'
+                    ' - `instanceid` (comma-separated), `name_pattern` (glob) '
+                    'and/or `region` \n'
                     )
                 embed = discord.Embed(
                     description=msg,
@@ -246,11 +419,12 @@ def instance(group_pci, ovh_client, my_nic):
                 return
 
             try:
-                instance = ovh_client.get(
-                    f'/cloud/project/{projectid}/instance/{instanceid}'
-                    )
-                ovh_client.delete(
-                    f'/cloud/project/{projectid}/instance/{instanceid}'
+                # One API call, the selection is done locally
+                instances = select_instances(
+                    await ovh_client.get(f'/cloud/project/{projectid}/instance'),
+                    ids=[item.strip() for item in (instanceid or '').split(',') if item.strip()],
+                    pattern=name_pattern,
+                    region=region,
                     )
             except Exception as e:
                 msg = f'API calls KO [{e}]'
@@ -261,20 +435,21 @@ def instance(group_pci, ovh_client, my_nic):
                 )
                 await ctx.respond(embed=embed)
                 return
-            else:
+
+            if len(instances) == 0:
                 embed = discord.Embed(
-                    title=f'**{my_nic}**',
-                    description=(
-                        f"The Public Cloud Instance "
-                        f"`{instance['name']}` in {instance['region']} "
-                        f"was deleted"
-                        ),
-                    colour=discord.Colour.green()
+                    description='No Instance matched',
+                    colour=discord.Colour.orange()
                 )
-                embed.set_footer(text=f"Project ID: {projectid}")
-
                 await ctx.respond(embed=embed)
+                return
 
+            # Nothing is deleted before the preview is confirmed
+            view = InstanceDeletionView(ctx, ovh_client, projectid, instances)
+            await ctx.respond(
+                embed=view.render(f'Delete {len(instances)} Instance(s)?'),
+                view=view,
+                )
             logger.debug(f'[#{channel}][{name}] └──> Queries OK')
             return
         elif action == 'create':
@@ -309,10 +484,63 @@ def instance(group_pci, ovh_client, my_nic):
                 await ctx.respond(embed=embed)
                 return
 
+            if quantity < 1 or quantity > INSTANCE_QUANTITY_LIMIT:
+                msg = f'Check that `quantity` is between 1 and {INSTANCE_QUANTITY_LIMIT}'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.red()
+                )
+                await ctx.respond(embed=embed)
+                return
+
+            playbooks = []
+            if playbook is not None:
+                try:
+                    if ansible_section is None:
+                        raise ValueError(
+                            'Check that you provided all variables: \n'
+                            ' - `ansible_section` \n'
+                            )
+                    playbooks = get_playbooks(playbook)
+                except ValueError as e:
+                    msg = str(e)
+                    logger.error(msg)
+                    embed = discord.Embed(
+                        description=msg,
+                        colour=discord.Colour.red()
+                    )
+                    await ctx.respond(embed=embed)
+                    return
+
+            try:
+                # Served from the disk/memory, refreshed in the background when stale
+                catalogue = await catalogue_cache.get(projectid)
+            except Exception as e:
+                msg = f'API calls KO (images/flavors catalogue) [{e}]'
+                logger.error(msg)
+                embed = discord.Embed(
+                    description=msg,
+                    colour=discord.Colour.red()
+                )
+                await ctx.respond(embed=embed)
+                return
+
             try:
                 await ctx.respond(
                     "Give me some parameters to fullfill this action:",
-                    view=InstanceCreationView(ctx, ovh_client, projectid, sshkeyid),
+                    view=InstanceCreationView(
+                        ctx,
+                        ovh_client,
+                        projectid,
+                        sshkeyid,
+                        catalogue,
+                        quantity=quantity,
+                        name_pattern=name_pattern,
+                        ansible_section=ansible_section,
+                        playbooks=playbooks,
+                        filters={'region': region, 'image': image, 'flavor': flavor},
+                        ),
                     ephemeral=True,
                     )
             except Exception as e:
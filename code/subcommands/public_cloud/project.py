@@ -15,9 +15,15 @@ from variables import (
     ROLE_TECH_RO,
 )
 
+from utils.embeds import (
+    group_embeds,
+    split_embed,
+)
+
 from ._autocomplete import (
     get_project_list,
 )
+from ._scanner import scan_projects
 
 
 def project(group_pci, ovh_client, my_nic):
@@ -69,7 +75,11 @@ def project(group_pci, ovh_client, my_nic):
 
         if action == 'list':
             try:
-                myprojects = ovh_client.get('/cloud/project')
+                # All the Projects are queried at once
+                myprojects = await scan_projects(
+                    ovh_client,
+                    lambda project_id: ovh_client.get(f'/cloud/project/{project_id}'),
+                    )
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -87,14 +97,22 @@ def project(group_pci, ovh_client, my_nic):
                     colour=discord.Colour.green()
                     )
 
-                for project_id in myprojects:
+                for project_id, project in myprojects:
                     # We start with the headers
                     embed_field_value_table = {
                         'Project Name': [],
                         'Project Status': [],
                     }
 
-                    project = ovh_client.get(f'/cloud/project/{project_id}')
+                    if isinstance(project, Exception):
+                        # This Project failed, the others are still displayed
+                        logger.warning(f'Project {project_id} KO [{project}]')
+                        embed.add_field(
+                            name=f'Project ID: **{project_id}**',
+                            value=f'(Error: {project})',
+                            inline=False,
+                            )
+                        continue
 
                     if project['status'] == 'suspended':
                         # Suspended Projects cannot be queried later
@@ -124,9 +142,11 @@ def project(group_pci, ovh_client, my_nic):
                         inline=False,
                         )
 
-                    await ctx.interaction.edit_original_response(
-                        embed=embed
-                        )
+                # Discord accepts up to 25 fields per embed, 10 embeds (6000 characters) per message
+                groups = group_embeds(split_embed(embed))
+                await ctx.interaction.edit_original_response(embeds=groups[0])
+                for group in groups[1:]:
+                    await ctx.respond(embeds=group)
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -153,7 +173,7 @@ def project(group_pci, ovh_client, my_nic):
                 return
 
             try:
-                project_response = ovh_client.get(f'/cloud/project/{projectid}')
+                project_response = await ovh_client.get(f'/cloud/project/{projectid}')
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
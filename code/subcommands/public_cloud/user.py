@@ -16,10 +16,16 @@ from variables import (
     ROLE_TECH_RW,
 )
 
+from utils.embeds import (
+    group_embeds,
+    split_embed,
+)
+
 from ._autocomplete import (
     get_project_list,
     get_user_list,
 )
+from ._scanner import scan_projects
 
 def user(group_pci, ovh_client, my_nic):
     """
@@ -82,8 +88,18 @@ def user(group_pci, ovh_client, my_nic):
 
         if action == 'list':
             # This command will require basic TECH_RO role, checked before
+            async def scan(project_id):
+                """ Fetches a Project and its Users. """
+                project = await ovh_client.get(f'/cloud/project/{project_id}')
+                if project['status'] == 'suspended':
+                    # Suspended Projects cannot be queried later
+                    return project, None
+                users = await ovh_client.get(f'/cloud/project/{project_id}/user')
+                return project, users
+
             try:
-                projects = ovh_client.get('/cloud/project')
+                # All the Projects are queried at once
+                projects = await scan_projects(ovh_client, scan)
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -101,15 +117,24 @@ def user(group_pci, ovh_client, my_nic):
                     colour=discord.Colour.green()
                     )
 
-                for project_id in projects:
+                for project_id, result in projects:
                     # We start with the headers
                     embed_field_value_table = {
                         'User Name': [],
                         'User Desc.': [],
                         }
 
-                    project = ovh_client.get(f'/cloud/project/{project_id}')
+                    if isinstance(result, Exception):
+                        # This Project failed, the others are still displayed
+                        logger.warning(f'Project {project_id} KO [{result}]')
+                        embed.add_field(
+                            name=f'Project ID: **{project_id}**',
+                            value=f'(Error: {result})',
+                            inline=False,
+                            )
+                        continue
 
+                    project, users = result
                     if project['status'] == 'suspended':
                         # Suspended Projects cannot be queried later
                         embed.add_field(
@@ -119,7 +144,6 @@ def user(group_pci, ovh_client, my_nic):
                             )
                         continue
 
-                    users = ovh_client.get(f'/cloud/project/{project_id}/user')
                     if len(users) == 0:
                         # There is no Users in the Project
                         embed.add_field(
@@ -149,9 +173,11 @@ def user(group_pci, ovh_client, my_nic):
                         inline=False,
                         )
 
-                    await ctx.interaction.edit_original_response(
-                        embed=embed
-                        )
+                # Discord accepts up to 25 fields per embed, 10 embeds (6000 characters) per message
+                groups = group_embeds(split_embed(embed))
+                await ctx.interaction.edit_original_response(embeds=groups[0])
+                for group in groups[1:]:
+                    await ctx.respond(embeds=group)
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -181,7 +207,7 @@ def user(group_pci, ovh_client, my_nic):
                 return
 
             try:
-                user = ovh_client.get(
+                user = await ovh_client.get(
                     f'/cloud/project/{projectid}/user/{userid}'
                     )
             except Exception as e:
@@ -239,10 +265,10 @@ def user(group_pci, ovh_client, my_nic):
                 return
 
             try:
-                user = ovh_client.get(
+                user = await ovh_client.get(
                     f'/cloud/project/{projectid}/user/{userid}'
                     )
-                ovh_client.delete(
+                await ovh_client.delete(
                     f'/cloud/project/{projectid}/user/{userid}'
                     )
             except Exception as e:
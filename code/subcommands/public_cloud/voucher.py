@@ -15,10 +15,17 @@ from variables import (
     ROLE_ACCOUNTING,
 )
 
+from utils.concurrency import gather_bounded
+from utils.embeds import (
+    group_embeds,
+    split_embed,
+)
+
 from ._autocomplete import (
     get_project_list,
     get_voucher_list,
 )
+from ._scanner import scan_projects
 
 def voucher(group_pci, ovh_client, my_nic):
     """
@@ -78,8 +85,17 @@ def voucher(group_pci, ovh_client, my_nic):
             )
 
         if action == 'list':
+            async def scan(project_id):
+                """ Fetches the Vouchers (credits) of a Project. """
+                credits_id = await ovh_client.get(f'/cloud/project/{project_id}/credit')
+                return await gather_bounded(
+                    ovh_client.get(f'/cloud/project/{project_id}/credit/{credit_id}')
+                    for credit_id in credits_id
+                    )
+
             try:
-                projects = ovh_client.get('/cloud/project')
+                # All the Projects are queried at once
+                projects = await scan_projects(ovh_client, scan)
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -97,7 +113,7 @@ def voucher(group_pci, ovh_client, my_nic):
                     colour=discord.Colour.green()
                     )
 
-                for project_id in projects:
+                for project_id, vouchers in projects:
                     # We start with the headers
                     embed_field_value_table = {
                         'Voucher': [],
@@ -106,22 +122,26 @@ def voucher(group_pci, ovh_client, my_nic):
                         'Description': [],
                         }
 
-                    credits_id = ovh_client.get(f'/cloud/project/{project_id}/credit')
-                    if len(credits_id) == 0:
-                        # There is no Vouchers in the Project
+                    if isinstance(vouchers, Exception):
+                        # This Project failed, the others are still displayed
+                        logger.warning(f'Project {project_id} KO [{vouchers}]')
                         embed.add_field(
                             name=f'Project ID: **{project_id}**',
-                            value='No Vouchers',
+                            value=f'(Error: {vouchers})',
                             inline=False,
                             )
                         continue
 
-                    for credit_id in credits_id:
-                        # We loop over the credits to grab their names
-                        voucher = ovh_client.get(
-                            f'/cloud/project/{project_id}/credit/{credit_id}'
+                    if len(vouchers) == 0:
+                        # There is no Vouchers in the Project
+                        embed.add_field(
+                            name=f'Project ID: **{project_id}**',
+                            value='No Vouchers',
+                            inline=False,
                             )
+                        continue
 
+                    for voucher in vouchers:
                         # We loop over the vouchers to grab their names
                         desc = textwrap.shorten(
                             voucher['description'],
@@ -155,9 +175,11 @@ def voucher(group_pci, ovh_client, my_nic):
                         inline=False,
                         )
 
-                    await ctx.interaction.edit_original_response(
-                        embed=embed
-                        )
+                # Discord accepts up to 25 fields per embed, 10 embeds (6000 characters) per message
+                groups = group_embeds(split_embed(embed))
+                await ctx.interaction.edit_original_response(embeds=groups[0])
+                for group in groups[1:]:
+                    await ctx.respond(embeds=group)
             except Exception as e:
                 msg = f'API calls KO [{e}]'
                 logger.error(msg)
@@ -0,0 +1,3 @@
+"""
+Shared helpers used by the Discord command definitions
+"""
@@ -0,0 +1,92 @@
+# -*- coding: utf8 -*-
+
+"""Module to keep API results in memory for a short time."""
+
+import asyncio
+import collections
+import time
+
+from loguru import logger
+
+
+class TTLCache:
+    """
+    In-memory cache with stale-while-revalidate.
+    - fresh entries are served from memory
+    - stale entries are served from memory, and refreshed in the background
+    - missing entries are fetched (once, even with concurrent callers)
+    Keys are tuples whose first item is the endpoint, used to group counters.
+    Subclasses can keep the entries elsewhere too (disk, ...): see _load/_store.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.refreshing = {}
+        self.counters = collections.defaultdict(
+            lambda: {'hit': 0, 'stale': 0, 'miss': 0}
+            )
+
+    async def get(self, key, fetch, ttl):
+        """
+        Returns the value cached under `key`.
+        `fetch` is a coroutine function (no argument) used to (re)build it.
+        """
+        entry = self.entries.get(key) or self._load(key, ttl)
+        if entry is None:
+            self.counters[key[0]]['miss'] += 1
+            # Shielded: a cancelled caller must not cancel the shared fetch
+            return await asyncio.shield(self._refresh(key, fetch, ttl))
+
+        expires_at, value = entry
+        if time.monotonic() < expires_at:
+            self.counters[key[0]]['hit'] += 1
+        else:
+            self.counters[key[0]]['stale'] += 1
+            self._refresh(key, fetch, ttl)
+        return value
+
+    def _refresh(self, key, fetch, ttl):
+        """ Starts a fetch for `key`, unless one is already running. """
+        task = self.refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, fetch, ttl))
+            task.add_done_callback(self._log_failure)
+            self.refreshing[key] = task
+        return task
+
+    async def _fetch(self, key, fetch, ttl):
+        try:
+            value = await fetch()
+        finally:
+            del self.refreshing[key]
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self._store(key, value)
+        return value
+
+    def _load(self, key, ttl):  # pylint: disable=unused-argument
+        """
+        Returns an entry kept elsewhere, as (monotonic expiry, value), or None.
+        Loaded entries are then served from memory.
+        """
+        return None
+
+    def _store(self, key, value):
+        """ Keeps a freshly fetched value elsewhere. """
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f'Cache refresh KO [{task.exception()}]')
+
+    def invalidate(self, endpoint, *args):
+        """ Drops the entries of `endpoint` (optionally matching `args`). """
+        for key in list(self.entries):
+            if key[0] == endpoint and key[1:len(args) + 1] == args:
+                del self.entries[key]
+
+    def stats(self):
+        """ Returns the hit/stale/miss counters, by endpoint. """
+        return {endpoint: dict(counter) for endpoint, counter in self.counters.items()}
+
+
+# Shared by every autocomplete & command
+api_cache = TTLCache()
@@ -0,0 +1,26 @@
+# -*- coding: utf8 -*-
+
+"""Module to run batches of API calls concurrently."""
+
+import asyncio
+
+from variables import (
+    OVH_API_CONCURRENCY,
+)
+
+
+async def gather_bounded(aws, limit=OVH_API_CONCURRENCY, return_exceptions=False):
+    """
+    Function to await a batch of awaitables with at most `limit` in flight.
+    Results are returned in the same order as the awaitables.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(
+        *[bounded(aw) for aw in aws],
+        return_exceptions=return_exceptions,
+        )
@@ -0,0 +1,51 @@
+# -*- coding: utf8 -*-
+
+"""Module to fit Embeds in the Discord message limits."""
+
+import discord
+
+# A message carries at most 10 Embeds, and 6000 characters across them
+EMBEDS_PER_MESSAGE = 10
+EMBEDS_CHARS_PER_MESSAGE = 6000
+# An Embed carries at most 25 fields
+FIELDS_PER_EMBED = 25
+
+
+def group_embeds(embeds):
+    """
+    Function to group Embeds in batches, each one fitting in one message.
+    Order is preserved.
+    """
+    groups = []
+    size = 0
+    for embed in embeds:
+        if (
+            len(groups) == 0
+            or len(groups[-1]) == EMBEDS_PER_MESSAGE
+            or size + len(embed) > EMBEDS_CHARS_PER_MESSAGE
+        ):
+            groups.append([])
+            size = 0
+        groups[-1].append(embed)
+        size += len(embed)
+    return groups
+
+
+def split_embed(embed):
+    """
+    Function to spread the fields of an Embed over as many Embeds as needed,
+    each one fitting in one message. The first one keeps the title/description.
+    """
+    if len(embed.fields) <= FIELDS_PER_EMBED and len(embed) <= EMBEDS_CHARS_PER_MESSAGE:
+        return [embed]
+
+    embeds = [embed.copy()]
+    embeds[0].clear_fields()
+    for field in embed.fields:
+        if (
+            len(embeds[-1].fields) == FIELDS_PER_EMBED
+            or len(embeds[-1]) + len(field.name) + len(field.value) > EMBEDS_CHARS_PER_MESSAGE
+        ):
+            embeds.append(discord.Embed(colour=embed.colour))
+        embeds[-1].add_field(name=field.name, value=field.value, inline=field.inline)
+    return embeds
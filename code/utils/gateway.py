@@ -0,0 +1,91 @@
+# -*- coding: utf8 -*-
+
+"""Module to share a single OVHcloud API client across the bot."""
+
+import asyncio
+import concurrent.futures
+import functools
+
+import ovh
+
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from variables import (
+    OVH_API_CONCURRENCY,
+)
+
+_GATEWAY = None
+
+
+class OVHGateway:
+    """
+    Process-wide OVHcloud API client.
+    It is built once, keeps its HTTP session (and its TCP/TLS connections)
+    alive, and only syncs time with the API on the first signed call.
+    Calls are awaitable: the blocking ovh.Client runs in a bounded thread pool
+    so a slow API answer never freezes the Discord event loop.
+    """
+    def __init__(self, endpoint, application_key, application_secret, consumer_key):
+        self.client = ovh.Client(
+            endpoint=endpoint,
+            application_key=application_key,
+            application_secret=application_secret,
+            consumer_key=consumer_key,
+            )
+        # The default requests pool keeps 10 connections per host
+        # We size it to match the number of calls we allow in parallel
+        adapter = HTTPAdapter(
+            pool_connections=OVH_API_CONCURRENCY,
+            pool_maxsize=OVH_API_CONCURRENCY,
+            )
+        self.client._session.mount('https://', adapter)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=OVH_API_CONCURRENCY,
+            thread_name_prefix='ovh-api',
+            )
+
+    async def _call(self, method, path, **kwargs):
+        """ Runs a blocking ovh.Client call in the thread pool. """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(method, path, **kwargs),
+            )
+
+    async def get(self, path, **kwargs):
+        """ Awaitable wrapper around ovh.Client.get """
+        return await self._call(self.client.get, path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        """ Awaitable wrapper around ovh.Client.post """
+        return await self._call(self.client.post, path, **kwargs)
+
+    async def put(self, path, **kwargs):
+        """ Awaitable wrapper around ovh.Client.put """
+        return await self._call(self.client.put, path, **kwargs)
+
+    async def delete(self, path, **kwargs):
+        """ Awaitable wrapper around ovh.Client.delete """
+        return await self._call(self.client.delete, path, **kwargs)
+
+
+def init_gateway(endpoint, application_key, application_secret, consumer_key):
+    """ Function to build the process-wide OVHGateway (once). """
+    global _GATEWAY  # pylint: disable=global-statement
+    if _GATEWAY is None:
+        _GATEWAY = OVHGateway(
+            endpoint=endpoint,
+            application_key=application_key,
+            application_secret=application_secret,
+            consumer_key=consumer_key,
+            )
+        logger.debug(f'OVHcloud API gateway OK ({OVH_API_CONCURRENCY} workers)')
+    return _GATEWAY
+
+
+def get_gateway():
+    """ Function to fetch the process-wide OVHGateway. """
+    if _GATEWAY is None:
+        raise RuntimeError('OVHcloud API gateway not initialized')
+    return _GATEWAY
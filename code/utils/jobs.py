@@ -0,0 +1,137 @@
+# -*- coding: utf8 -*-
+
+"""Module to run long operations in the background."""
+
+import asyncio
+import collections
+import itertools
+import time
+
+from loguru import logger
+
+from variables import (
+    JOBS_HISTORY,
+    JOBS_WORKERS,
+)
+
+
+class Job:
+    """ A long-running operation, tracked for /{DISCORD_GROUP_GENERAL} jobs. """
+    def __init__(self, job_id, name, target, author, hosts):
+        self.id = job_id  # pylint: disable=invalid-name
+        self.name = name
+        self.target = target
+        self.hosts = hosts
+        self.author = author
+        self.status = 'queued'
+        self.output = ''
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.ended_at = None
+        self.task = None
+
+    @property
+    def duration(self):
+        """ Seconds spent running (so far). """
+        if self.started_at is None:
+            return 0
+        return (self.ended_at or time.time()) - self.started_at
+
+    @property
+    def finished(self):
+        """ True when the job will not change anymore. """
+        return self.status in ('done', 'failed')
+
+
+class JobManager:
+    """
+    Bounded pool of background jobs.
+    - at most `workers` jobs run at the same time
+    - jobs sharing hosts run one after the other, in submission order
+    - the last `history` jobs are kept for display
+    """
+    def __init__(self, workers, history):
+        self.workers = workers
+        self.history = history
+        self.jobs = collections.OrderedDict()
+        self.counter = itertools.count(1)
+        # Hosts claimed by the jobs not finished yet: {job id: hosts}
+        self.claims = collections.OrderedDict()
+        self._slots = None
+        self._released = None
+
+    def submit(self, name, target, author, work, hosts=None):
+        """
+        Enqueues `work(job)` (a coroutine function) and returns the Job at once.
+        `work` can update job.output while running, and raises on failure.
+        `target` is displayed, `hosts` (a set) is what the job touches:
+        None means unknown, the job then waits for all the previous ones.
+        """
+        if self._slots is None:
+            # Created here to be bound to the running event loop
+            self._slots = asyncio.Semaphore(self.workers)
+            self._released = asyncio.Condition()
+
+        job = Job(next(self.counter), name, target, author, hosts)
+        self.jobs[job.id] = job
+        self.claims[job.id] = hosts
+        self._trim()
+        job.task = asyncio.ensure_future(self._run(job, work))
+        logger.info(f'Job #{job.id} queued ({name} on {target})')
+        return job
+
+    def _blocked(self, job):
+        """ True while a job submitted before this one shares some hosts. """
+        for job_id, hosts in self.claims.items():
+            if job_id == job.id:
+                return False
+            if hosts is None or job.hosts is None or not hosts.isdisjoint(job.hosts):
+                return True
+        return False
+
+    async def _run(self, job, work):
+        try:
+            # The hosts are waited for first, so a job waiting for its hosts
+            # does not hold one of the workers
+            async with self._released:
+                await self._released.wait_for(lambda: not self._blocked(job))
+            async with self._slots:
+                job.status = 'running'
+                job.started_at = time.time()
+                try:
+                    await work(job)
+                except Exception as e:
+                    job.status = 'failed'
+                    job.error = str(e)
+                    logger.error(f'Job #{job.id} KO [{e}]')
+                else:
+                    job.status = 'done'
+                    logger.info(f'Job #{job.id} OK ({job.duration:.1f}s)')
+                finally:
+                    job.ended_at = time.time()
+        finally:
+            # Claims are dropped with the job, nothing piles up
+            async with self._released:
+                del self.claims[job.id]
+                self._released.notify_all()
+
+    def _trim(self):
+        """ Forgets the oldest finished jobs beyond `history`. """
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.history:
+                break
+            if self.jobs[job_id].finished:
+                del self.jobs[job_id]
+
+    def get(self, job_id):
+        """ Returns a Job, or None. """
+        return self.jobs.get(job_id)
+
+    def recent(self):
+        """ Returns the known jobs, most recent first. """
+        return list(reversed(self.jobs.values()))
+
+
+# Shared by every command
+job_manager = JobManager(JOBS_WORKERS, JOBS_HISTORY)
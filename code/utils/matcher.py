@@ -0,0 +1,86 @@
+# -*- coding: utf8 -*-
+
+"""Module to rank Autocomplete choices against the user input."""
+
+import heapq
+import re
+
+# Discord ignores anything after the 25th Autocomplete choice
+AUTOCOMPLETE_LIMIT = 25
+
+# Characters splitting words inside names (web-01.example, my_project, ...)
+WORD_SEPARATORS = re.compile(r'[\s\-_./:()\[\]@]+')
+
+
+def match_score(value, term, words):
+    """
+    Function to score how well `value` matches `term` (lower is better).
+    - 0: exact match
+    - 1: prefix match
+    - 2: prefix match of one of the words
+    - 3: substring match
+    - 4+: fuzzy match (characters in order, penalized by the gaps)
+    Returns None when `value` does not match at all.
+    """
+    if term == value:
+        return 0
+    if term.startswith(value):
+        return 1
+    if any(word.startswith(value) for word in words):
+        return 2
+    if value in term:
+        return 3
+
+    # Fuzzy: every character of value is found, in order, in term
+    gaps = 0
+    position = -1
+    for char in value:
+        found = term.find(char, position + 1)
+        if found == -1:
+            return None
+        if position != -1:
+            gaps += found - position - 1
+        position = found
+    return 4 + gaps / len(term)
+
+
+class ChoiceIndex:
+    """
+    Indexed list of Autocomplete choices.
+    Each choice comes with the terms (name, id, ...) it can be searched with,
+    lowered and split once, so each keystroke only pays for the matching.
+    """
+    def __init__(self, entries):
+        self.entries = []
+        for choice, terms in entries:
+            terms = tuple(str(term).lower() for term in terms if term)
+            words = tuple(
+                word
+                for term in terms
+                for word in WORD_SEPARATORS.split(term)
+                if word
+                )
+            self.entries.append((choice, terms, words))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, value, limit=AUTOCOMPLETE_LIMIT, fuzzy=True):
+        """
+        Returns the `limit` best choices matching `value`, best first.
+        Without `fuzzy`, only exact/prefix/substring matches are returned.
+        """
+        value = (value or '').strip().lower()
+        if value == '':
+            return [choice for choice, _, _ in self.entries[:limit]]
+
+        ranked = []
+        for position, (choice, terms, words) in enumerate(self.entries):
+            scores = [
+                score
+                for score in (match_score(value, term, words) for term in terms)
+                if score is not None and (fuzzy or score < 4)
+                ]
+            if scores:
+                ranked.append((min(scores), position, choice))
+        return [choice for _, _, choice in heapq.nsmallest(limit, ranked)]